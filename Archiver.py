@@ -0,0 +1,170 @@
+import json
+import os
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Multithreaded zip writer, a replacement for shutil.make_archive(..., 'zip').
+# Files are cut into chunks that are deflated on a thread pool (zlib releases the GIL),
+# pigz style: every chunk is primed with the last 32 KB of the previous one and ends
+# with a sync flush, so the chunks concatenate into one ordinary deflate stream.
+# Chunks are written in archive order as soon as they are ready, so memory stays at
+# a few chunks per thread. Already compressed files are stored as they are.
+
+DEFAULT_LEVEL = 6
+CHUNK_SIZE = 4 * 2**20
+DICT_SIZE = 32 * 2**10
+STORED_EXTENSIONS = (".br", ".gz", ".unityweb", ".apk", ".obb", ".aab", ".zip", ".7z")
+
+
+def is_stored(path):
+    return path.lower().endswith(STORED_EXTENSIONS)
+
+
+def compress_chunk(data, zdict, level, last):
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def iter_chunks(path):
+    # (data, previous chunk tail, is last chunk); an empty file is one empty last chunk
+    with open(path, "rb") as f:
+        data = f.read(CHUNK_SIZE)
+        tail = None
+        while True:
+            next_data = f.read(CHUNK_SIZE)
+            yield data, tail, not next_data
+            if not next_data:
+                return
+            tail = data[-DICT_SIZE:]
+            data = next_data
+
+
+def iter_entries(folder):
+    # (path, name in archive) in a stable order, folders before their files
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        rel_root = os.path.relpath(root, folder)
+        if rel_root != ".":
+            yield root, rel_root.replace(os.sep, "/") + "/"
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield path, os.path.relpath(path, folder).replace(os.sep, "/")
+
+
+class _EntryWriter:
+    # Writes one member with data that is already compressed.
+    # Uses zipfile internals (the same steps as ZipFile.open(..., 'w')), since zipfile
+    # has no public way to add pre-deflated data.
+    def __init__(self, zf, zinfo):
+        self.zf = zf
+        self.zinfo = zinfo
+        self.zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+
+        zinfo.CRC = zinfo.compress_size = 0
+        zf._writecheck(zinfo)
+        zf._didModify = True
+        zinfo.header_offset = zf.fp.tell()
+        zf.fp.write(zinfo.FileHeader(self.zip64))
+
+    def write(self, raw, compressed):
+        self.crc = zlib.crc32(raw, self.crc)
+        self.file_size += len(raw)
+        self.compress_size += len(compressed)
+        self.zf.fp.write(compressed)
+
+    def close(self):
+        zinfo = self.zinfo
+        zinfo.CRC = self.crc
+        zinfo.file_size = self.file_size
+        zinfo.compress_size = self.compress_size
+        end = self.zf.fp.tell()
+        # Sizes and CRC are known only now: rewrite the local header in place
+        self.zf.fp.seek(zinfo.header_offset)
+        self.zf.fp.write(zinfo.FileHeader(self.zip64))
+        self.zf.fp.seek(end)
+        self.zf.filelist.append(zinfo)
+        self.zf.NameToInfo[zinfo.filename] = zinfo
+        self.zf.start_dir = end
+
+
+def make_zip(folder, zip_path, level=DEFAULT_LEVEL, threads=None, log=None):
+    threads = threads or os.cpu_count() or 1
+    max_pending = threads * 2
+    tmp_path = f"{zip_path}.tmp"
+    stored = deflated = 0
+
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf, \
+            ThreadPoolExecutor(max_workers=threads, thread_name_prefix="zip") as pool:
+        # (zinfo, raw chunk, future or stored bytes, first, last) in archive order.
+        # Later files are compressed while earlier ones are still being written
+        pending = deque()
+        writer = None
+
+        def write_next():
+            nonlocal writer
+            zinfo, raw, result, first, last = pending.popleft()
+            if zinfo.is_dir():
+                zf.writestr(zinfo, b"")
+                return
+            if first:
+                writer = _EntryWriter(zf, zinfo)
+            writer.write(raw, result.result() if hasattr(result, "result") else result)
+            if last:
+                writer.close()
+
+        for path, name in iter_entries(folder):
+            zinfo = zipfile.ZipInfo.from_file(path, name, strict_timestamps=False)
+            if zinfo.is_dir():
+                pending.append((zinfo, None, None, True, True))
+                continue
+
+            store = is_stored(name)
+            zinfo.compress_type = zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED
+            first = True
+            for data, tail, last in iter_chunks(path):
+                if store:
+                    result = data
+                else:
+                    result = pool.submit(compress_chunk, data, tail, level, last)
+                pending.append((zinfo, data, result, first, last))
+                first = False
+                while len(pending) > max_pending:
+                    write_next()
+            if store:
+                stored += 1
+            else:
+                deflated += 1
+
+        while pending:
+            write_next()
+
+    os.replace(tmp_path, zip_path)
+    if log:
+        log.info(f"Zipped {deflated} file(s) with {threads} thread(s) at level {level}, "
+                 f"stored {stored} already compressed file(s): {zip_path}")
+    return zip_path
+
+
+def write_manifest(archive_path, parts):
+    # Describes the volumes of an archive and their order, for whoever downloads them
+    # one by one from Telegram or Dropbox. Returns the manifest dict used by the uploads
+    manifest_path = f"{archive_path}.manifest.json"
+    entries = [{"index": index, "name": os.path.basename(path), "size": os.path.getsize(path)}
+               for index, path in enumerate(parts, 1)]
+    with open(manifest_path, "w") as f:
+        json.dump({"archive": os.path.basename(archive_path), "parts": entries,
+                   "total_size": sum(entry["size"] for entry in entries)}, f, indent=2)
+    return {"archive": archive_path, "parts": list(parts), "manifest_path": manifest_path}
+
+
+def get_single_manifest(path):
+    # An upload of one file or folder that was not archived
+    return {"archive": path, "parts": [path], "manifest_path": None}
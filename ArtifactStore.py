@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import DropboxSync
+import Fingerprint
+import StateStore
+
+# Content hash of every artifact that was published, per target and destination.
+# Rebuilding the same commit (FORCE_BUILD_GIT, REPUBLISH_UNCHANGED) often gives a
+# byte-identical build; it is then not uploaded to a destination that already has it.
+# The hash covers the build output itself (file names and contents), not the archive,
+# since a fresh zip of the same files differs by timestamps. Kept in the state store.
+
+STORE_DIR = Fingerprint.FINGERPRINT_DIR  # Files from before the state store
+
+
+def get_hash(path, threads=None):
+    # One file, or a folder: relative names and contents of all its files
+    if os.path.isfile(path):
+        return DropboxSync.hash_file(path)
+    files = sorted(DropboxSync.list_files(path))
+    with ThreadPoolExecutor(max_workers=threads or min(32, (os.cpu_count() or 1) * 2)) as pool:
+        hashes = pool.map(DropboxSync.hash_file, [os.path.join(path, rel_path) for rel_path in files])
+        digest = hashlib.sha256()
+        for rel_path, file_hash in zip(files, hashes):
+            digest.update(f"{rel_path.replace(os.sep, '/')}\0{file_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_path(key):
+    project, target = key
+    name = os.path.basename(str(project).strip("\\/"))
+    return os.path.join(STORE_DIR, f"published_{name}_{target}.json")
+
+
+def load(key):
+    # sink name -> {"hash": ..., "time": ...}
+    try:
+        with open(get_path(key)) as f:
+            published = json.load(f)
+    except (OSError, ValueError):
+        published = {}
+    published.update(StateStore.get_published(key))
+    return published
+
+
+def is_published(key, sink, artifact_hash):
+    return load(key).get(sink, {}).get("hash") == artifact_hash
+
+
+def save(key, sink, artifact_hash):
+    StateStore.set_published(key, sink, artifact_hash)
@@ -0,0 +1,132 @@
+import logging
+import os
+import threading
+from collections import deque
+
+# Log of every build, for failure reports, with bounded memory. Each (project, target)
+# logger has a BuildLogHandler. A build starts a capture: its newest lines are kept in
+# a ring buffer of at most MAX_BUFFER bytes, and the older lines it pushes out are
+# spilled to log/builds/<project>_<target>.log instead of being kept in memory. When
+# the build finishes the rest is written there too, so that file is the full log of
+# the target's last build, ready to attach to a failure notification. Lines logged
+# between builds only go to the ring buffer.
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "log", "builds")
+MAX_BUFFER = 256 * 1024         # Bytes of log lines kept in memory per target
+MAX_FILE_SIZE = 50 * 2**20      # Bytes of one build's log on disk; the rest is dropped
+FINISHED_STAGES = ("done", "failed", "cancelled", "skipped")
+
+_handlers = {}  # (project, target) -> BuildLogHandler
+_handlers_lock = threading.Lock()
+
+
+class BuildLogHandler(logging.Handler):
+    def __init__(self, file_name):
+        super().__init__()
+        self.file_name = file_name
+        self.lines = deque()
+        self.buffered = 0       # Bytes in self.lines
+        self.capturing = False  # Between start() and finish()
+        self.file = None        # Spill file of the running build
+        self.written = 0        # Bytes in the spill file
+        self.path = None        # Full log of the last finished build
+
+    def get_path(self):
+        return os.path.join(LOG_DIR, f"{self.file_name}.log")
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.acquire()
+        try:
+            self.lines.append(line)
+            self.buffered += len(line) + 1
+            while self.buffered > MAX_BUFFER and len(self.lines) > 1:
+                old = self.lines.popleft()
+                self.buffered -= len(old) + 1
+                if self.capturing:
+                    self.spill(old)
+        finally:
+            self.release()
+
+    def spill(self, line):
+        # Call with the handler lock held
+        if self.file is None:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            self.file = open(self.get_path(), "w", encoding="utf-8")
+            self.written = 0
+        if self.written > MAX_FILE_SIZE:
+            return
+        self.file.write(line + "\n")
+        self.written += len(line) + 1
+        if self.written > MAX_FILE_SIZE:
+            self.file.write(f"[Log cut off at {MAX_FILE_SIZE} bytes]\n")
+
+    def start(self):
+        self.acquire()
+        try:
+            self.close_file()
+            self.lines.clear()
+            self.buffered = 0
+            self.capturing = True
+        finally:
+            self.release()
+
+    def finish(self):
+        # Writes what is still in memory after the spilled lines
+        self.acquire()
+        try:
+            if not self.capturing:
+                return
+            for line in self.lines:
+                self.spill(line)
+            self.close_file()
+            self.capturing = False
+            self.path = self.get_path()
+        except OSError:
+            self.close_file()
+            self.capturing = False
+            self.path = None
+        finally:
+            self.release()
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def get_handler(key, formatter=None):
+    # One per (project, target), however often the logger is set up
+    with _handlers_lock:
+        if key not in _handlers:
+            project, target = key
+            name = os.path.basename(str(project).strip("\\/"))
+            handler = BuildLogHandler(f"{name}_{target}")
+            if formatter:
+                handler.setFormatter(formatter)
+            _handlers[key] = handler
+        return _handlers[key]
+
+
+def start(keys):
+    for key in keys:
+        handler = _handlers.get(key)
+        if handler:
+            handler.start()
+
+
+def on_stage(key, stage):
+    # Scheduler callback: a final stage ends the build's capture
+    handler = _handlers.get(key)
+    if handler and stage in FINISHED_STAGES:
+        handler.finish()
+
+
+def get_file(key):
+    # Full log of the key's last finished build, or None
+    handler = _handlers.get(key)
+    return handler.path if handler else None
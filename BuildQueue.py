@@ -0,0 +1,199 @@
+import subprocess
+import threading
+import time
+import ProcessUtils
+
+# Pending builds keyed by (project, target).
+# A newer commit replaces the pending one for the same key, and a build is only
+# dispatched once its key has been quiet for quiet_period seconds, so a burst of
+# pushes becomes one build. A running build of an older commit can be cancelled:
+# every process it started through run_command() is killed with its whole tree.
+
+QUIET_PERIOD = 30  # Seconds without new commits before a build starts
+MAX_QUIET_WAIT = 600  # A constant stream of pushes still gets built after this long
+DISPATCH_INTERVAL = 1
+
+_current = threading.local()
+
+
+class BuildCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self.cancelled = False
+        self.procs = set()
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            procs = list(self.procs)
+        for proc in procs:
+            ProcessUtils.kill_process_tree(proc)
+
+    def check(self):
+        if self.cancelled:
+            raise BuildCancelled("superseded by a newer commit")
+
+
+def get_current_token():
+    return getattr(_current, "token", None)
+
+
+def check_cancelled():
+    token = get_current_token()
+    if token:
+        token.check()
+
+
+def run_with_token(token, fn, *args, **kwargs):
+    # Runs fn in this thread as part of `token`'s build: its run_command processes can be killed
+    previous = get_current_token()
+    _current.token = token
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.token = previous
+
+
+def run_command(cmd, shell=False, on_output=None, on_start=None):
+    # subprocess.run(cmd, check=True) that the build queue can kill.
+    # Only queued builds get their own process group, so Ctrl+C still reaches the rest.
+    # on_output(text) gets stdout and stderr as they arrive instead of the console.
+    # on_start(proc) gets the process to watch; it runs in its own group too, so a
+    # watchdog can kill the whole tree with ProcessUtils.kill_process_tree
+    token = get_current_token()
+    if token:
+        token.check()
+
+    own_group = bool(token or on_start)
+    kwargs = ProcessUtils.get_popen_kwargs() if own_group else {}
+    if on_output:
+        kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    proc = subprocess.Popen(cmd, shell=shell, **kwargs)
+    if token:
+        with token.lock:
+            token.procs.add(proc)
+        if token.cancelled:
+            ProcessUtils.kill_process_tree(proc)
+    if on_start:
+        on_start(proc)
+    try:
+        if on_output:
+            for data in iter(lambda: proc.stdout.read1(4096), b""):
+                on_output(data.decode("utf-8", "replace"))
+        returncode = proc.wait()
+    except BaseException:
+        if own_group:
+            ProcessUtils.kill_process_tree(proc)
+        else:
+            proc.kill()  # Not a group leader, killpg would miss it
+        raise
+    finally:
+        if on_output:
+            proc.stdout.close()
+        if token:
+            with token.lock:
+                token.procs.discard(proc)
+
+    if token:
+        token.check()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
+
+
+class PendingBuild:
+    def __init__(self, commit, fn, args, kwargs):
+        self.commit = commit
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.superseded = 0
+
+
+class BuildQueue:
+    def __init__(self, scheduler, quiet_period=QUIET_PERIOD, cancel_superseded=True):
+        self.scheduler = scheduler
+        self.quiet_period = quiet_period
+        self.cancel_superseded = cancel_superseded
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> PendingBuild
+        self.running = {}  # key -> (commit, CancelToken)
+        self.thread = None
+
+    def push(self, key, commit, fn, *args, **kwargs):
+        with self.lock:
+            previous = self.pending.get(key)
+            entry = PendingBuild(commit, fn, args, kwargs)
+            if previous:
+                entry.first_seen = previous.first_seen
+                if previous.commit == commit:
+                    entry.last_seen = previous.last_seen
+                entry.superseded = previous.superseded + (previous.commit != commit)
+            self.pending[key] = entry
+            running = self.running.get(key)
+
+        # Killing process trees can take a while, so outside the lock
+        if running and running[0] != commit and self.cancel_superseded:
+            running[1].cancel()
+
+    def cancel(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+            running = self.running.get(key)
+        if running:
+            running[1].cancel()
+
+    def cancel_all(self):
+        with self.lock:
+            self.pending.clear()
+            tokens = [token for _, token in self.running.values()]
+        for token in tokens:
+            token.cancel()
+
+    def get_snapshot(self):
+        with self.lock:
+            return {
+                "pending": {key: entry.commit for key, entry in self.pending.items()},
+                "running": {key: commit for key, (commit, _) in self.running.items()},
+            }
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._dispatch_loop, daemon=True, name="build-queue")
+            self.thread.start()
+
+    def _dispatch_loop(self):
+        while True:
+            self.dispatch()
+            time.sleep(DISPATCH_INTERVAL)
+
+    def dispatch(self):
+        # Starts every pending build that is quiet and whose key is not running
+        now = time.time()
+        with self.lock:
+            ready = [key for key, entry in self.pending.items()
+                     if key not in self.running and (now - entry.last_seen >= self.quiet_period
+                                                     or now - entry.first_seen >= MAX_QUIET_WAIT)]
+            for key in ready:
+                entry = self.pending.pop(key)
+                token = CancelToken()
+                self.running[key] = (entry.commit, token)
+                if self.scheduler.submit(key, self._run, key, entry, token) is None:
+                    # Slot still busy with work started outside the queue; retry later
+                    del self.running[key]
+                    self.pending.setdefault(key, entry)
+
+    def _run(self, key, entry, token):
+        _current.token = token
+        try:
+            return entry.fn(*entry.args, **entry.kwargs)
+        finally:
+            _current.token = None
+            with self.lock:
+                self.running.pop(key, None)
@@ -0,0 +1,99 @@
+import re
+import subprocess
+import time
+import ButlerPath
+from BuildQueue import run_command
+
+# butler push with its output read back: butler diffs what it is given against the
+# channel's last build and uploads only the patch, so it is pushed the raw build
+# folder (a fresh zip would change every byte). The summary lines it prints
+#   ∙ Pushing 1.2 GiB (3 files, 2 dirs, 0 symlinks)
+#   ✓ Added 1.2 MiB fresh data
+#   ✓ 2.3 MiB patch (99.8% savings)
+# are parsed, so the log tells how much was really uploaded.
+
+SIZE = r"[\d.]+ [KMGTP]?i?B"
+PATTERNS = {
+    "size": re.compile(rf"Pushing ({SIZE})"),
+    "fresh": re.compile(rf"Added ({SIZE}) fresh data"),
+    "patch": re.compile(rf"({SIZE}) patch"),
+    "savings": re.compile(r"\(([\d.]+)% savings\)"),
+}
+UNCHANGED = re.compile(r"not pushing anything|No changes", re.IGNORECASE)
+UNITS = {"B": 1, "KiB": 2**10, "MiB": 2**20, "GiB": 2**30, "TiB": 2**40, "PiB": 2**50,
+         "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12, "PB": 10**15}
+TAIL_LINES = 20
+
+
+class ButlerError(Exception):
+    pass
+
+
+def to_bytes(size):
+    # "2.3 MiB" -> 2411724; None if butler printed something else
+    number, _, unit = (size or "").partition(" ")
+    try:
+        return int(float(number) * UNITS[unit])
+    except (ValueError, KeyError):
+        return None
+
+
+class OutputParser:
+    # Fed with output chunks as they come; lines can be split between chunks
+    def __init__(self):
+        self.partial = ""
+        self.stats = {"unchanged": False}
+        self.tail = []
+
+    def feed(self, text):
+        # Progress bars redraw their line with \r
+        lines = re.sub(r"[\b\r]+", "\n", self.partial + text).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self.parse_line(line)
+
+    def close(self):
+        if self.partial:
+            self.parse_line(self.partial)
+            self.partial = ""
+
+    def parse_line(self, line):
+        line = line.strip()
+        if not line:
+            return
+        self.tail = (self.tail + [line])[-TAIL_LINES:]
+        for name, pattern in PATTERNS.items():
+            match = pattern.search(line)
+            if match:
+                self.stats[name] = match.group(1)
+        if UNCHANGED.search(line):
+            self.stats["unchanged"] = True
+
+
+def push(path, channel, if_changed=False, log=None):
+    # Returns the parsed stats plus "duration" and "patch_bytes" (what was really uploaded);
+    # ButlerError with butler's last lines on failure
+    cmd = [ButlerPath.get(), "push", path, channel]
+    if if_changed:
+        # butler itself skips the push when the patch against the channel would be empty
+        cmd.append("--if-changed")
+
+    parser = OutputParser()
+    started = time.time()
+    try:
+        run_command(cmd, on_output=parser.feed)
+    except subprocess.CalledProcessError as e:
+        parser.close()
+        raise ButlerError(f"butler exited with code {e.returncode}: {' | '.join(parser.tail[-5:])}")
+    parser.close()
+    stats = dict(parser.stats, duration=time.time() - started)
+    stats["patch_bytes"] = 0 if stats["unchanged"] else to_bytes(stats.get("patch"))
+
+    if log:
+        if stats["unchanged"]:
+            log.info(f"butler: {channel} unchanged, nothing pushed ({stats['duration']:.1f}s)")
+        else:
+            log.info(f"butler: pushed {stats.get('size', '?')} to {channel} as a {stats.get('patch', '?')} patch "
+                     f"({stats.get('savings', '?')}% savings, {stats.get('fresh', '?')} fresh data) "
+                     f"in {stats['duration']:.1f}s")
+    return stats
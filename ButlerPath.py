@@ -1,9 +1,14 @@
+import os
 import platform
 
 # Path to the butler executable (assuming you're running the script from the butler directory)
 # you can read about butler here https://itch.io/docs/butler/login.html
 
 def get():
+    # Override, e.g. a stand-in: BUTLER_PATH=Fakes/FakeButler.py
+    if os.environ.get("BUTLER_PATH"):
+        return os.environ["BUTLER_PATH"]
+
     PLATFORM = platform.system()
 
     if PLATFORM == "Windows":
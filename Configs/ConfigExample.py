@@ -11,22 +11,49 @@ ENV = {
     "ITCH_PROJECT": 'sangheli/example',
     "BRANCH": 'origin/main',
     "REPO_PATH": 'C:\\_Work\\exaple',
-    "FORCE_BUILD_GIT": True, # skip git listen on first build
+    "FORCE_BUILD_GIT": True, # skip git listen on first build (once per commit, a restart does not force it again)
     "UPLOAD_TO_ITCH": True,
     "TELEGRAM_BOT_TOKEN": "",
     "TELEGRAM_CHAT_ID": "",
+    # "TELEGRAM_API_URL": "http://127.0.0.1:8081",  # local Bot API server or Fakes/FakeTelegramApi.py
+    "NOTIFY_FAILURES": False, # send failed builds to TELEGRAM_CHAT_ID with the build's log attached
     "DROPBOX_PATH": "C:\\Dropbox\\Public",
+    "WEBHOOK_SECRET": "",  # shared secret of the push webhook (see WEBHOOK_PORT in autobuilder.py)
+    # "WEBHOOK_REPO": 'sangheli/example',  # if the remote URL of REPO_PATH does not match the host's repo name
+    "USE_WORKTREES": False, # separate checkout per target, so targets can build at the same time
+    "WORKTREE_MODE": "worktree",  # worktree или clone
+    # "WORKTREE_ROOT": 'C:\\_Work\\exaple_worktrees',
+    "BATCH_TARGETS": False, # build all targets in one Unity launch (Builder.BuildMany)
+    "WARM_EDITOR": False, # keep one batchmode editor running and send it build requests (BuildServer.cs)
+    "WARM_EDITOR_MAX_MEMORY_MB": 12000,  # restart the editor above this
+    "WARM_EDITOR_BUILD_TIMEOUT": 3600,
+    "UNITY_MAX_SILENCE": 1800, # kill Unity when its log did not grow for this many seconds
+    # "UNITY_BUILD_TIMEOUT": 14400,  # kill Unity after this many seconds in any case
+    "LIBRARY_CACHE": False, # keep a Library folder per BUILD_TARGET (without worktrees)
+    "LIBRARY_CACHE_MAX_GB": 50,
+    # "LIBRARY_CACHE_PATH": 'C:\\_Work\\exaple_library_cache',  # must be on the same drive
+    "SKIP_UNCHANGED_BUILDS": True, # no Unity run if Assets/Packages/ProjectSettings, Unity and the config did not change
+    "PATCH_NOTES_MAX_COMMITS": 50, # commits in the patch notes since the target's last published build
+    "SKIP_UNCHANGED_UPLOADS": True, # no upload to a destination that already got a byte-identical build of the target
 }
 
 CONFIGS = [
     {
         "BUILD_PATH": 'webgl_build',
         "ITCH_TARGET": 'webgl',
+        # "BUTLER_IF_CHANGED": True,  # butler push --if-changed: no new itch build when nothing changed
         "BUILD_TARGET": "WebGL",
-        "ZIP_BEFORE_UPLOAD": True,
+        # "REPUBLISH_UNCHANGED": True,  # upload the previous build again when Unity was skipped
+        "ZIP_BEFORE_UPLOAD": True,  # for Telegram and Dropbox; itch always gets the build folder (butler diffs it)
         "ZIP_METHOD": "zip",  # zip или 7z
+        # "ZIP_LEVEL": 6,  # 1 (fast) .. 9 (small); 7z defaults to 9
+        # "ZIP_THREADS": 4,  # compression threads, all cores by default
+        # "ZIP_VOLUME_SIZE": "49m",  # 7z volume size, None for one file
+        # "UPLOAD_TIMEOUT": 1800,  # seconds per upload attempt, per destination
+        # "UPLOAD_RETRIES": 2,  # retries with growing pauses (10s, 20s, ...)
         "UPLOAD_TELEGRAM": False,
         "UPLOAD_DROPBOX": False,
+        # "DROPBOX_SYNC": True,  # mirror the unzipped build folder into DROPBOX_PATH, copying only changed files
     },
     {
         "BUILD_PATH": 'pc_build',
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import Fingerprint
+
+# Mirrors an unzipped build folder into the Dropbox folder instead of copying the
+# whole archive every build. Files are compared by content hash, so only the ones
+# that really changed are written (and re-uploaded by the Dropbox client); files
+# removed from the build are removed from the mirror. Every file is written next to
+# its target and renamed over it, so Dropbox never picks up a half-written file.
+# Hashes are computed on a thread pool (hashlib releases the GIL) and cached by
+# size and mtime, so the mirror side is not re-read on every build.
+
+HASH_BLOCK = 2**20
+CACHE_DIR = Fingerprint.FINGERPRINT_DIR
+TMP_SUFFIX = ".autobuilder-tmp"
+
+
+class HashCache:
+    # abs path -> [size, mtime_ns, sha256], saved between runs
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get_hash(self, path):
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = hash_file(path)
+        self.put(path, digest, stat)
+        return digest
+
+    def put(self, path, digest, stat=None):
+        stat = stat or os.stat(path)
+        with self.lock:
+            self.entries[path] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    def forget(self, path):
+        with self.lock:
+            self.entries.pop(path, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Entries of files that no longer exist would only grow the file
+        with self.lock:
+            entries = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(entries, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_files(folder):
+    # relative path (with os.sep) -> size; temp files of an interrupted sync are left out
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if name.endswith(TMP_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, folder)] = os.path.getsize(path)
+    return files
+
+
+def copy_file(source, target):
+    # Copy under a temporary name next to the target, then rename over it
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_path = target + TMP_SUFFIX
+    shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def get_cache_path(target_folder):
+    name = os.path.basename(os.path.normpath(target_folder))
+    key = hashlib.sha1(os.path.abspath(target_folder).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"dropbox_{name}_{key}.json")
+
+
+def remove_empty_folders(folder):
+    for root, dirs, files in os.walk(folder, topdown=False):
+        if root != folder and not os.listdir(root):
+            os.rmdir(root)
+
+
+def sync_folder(source, target, log, threads=None):
+    # Makes `target` a copy of `source`. Returns (copied, deleted, unchanged, copied bytes)
+    started = time.time()
+    threads = threads or min(32, (os.cpu_count() or 1) * 2)
+    cache = HashCache(get_cache_path(target))
+    source_files = list_files(source)
+    target_files = list_files(target) if os.path.isdir(target) else {}
+
+    def is_changed(rel_path):
+        target_path = os.path.join(target, rel_path)
+        # A different size needs no hashing at all
+        if target_files.get(rel_path) != source_files[rel_path]:
+            return True
+        return cache.get_hash(os.path.join(source, rel_path)) != cache.get_hash(target_path)
+
+    def copy(rel_path):
+        source_path, target_path = os.path.join(source, rel_path), os.path.join(target, rel_path)
+        copy_file(source_path, target_path)
+        cache.put(target_path, cache.get_hash(source_path))
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="sync") as pool:
+        changed = [rel_path for rel_path, is_new in zip(source_files, pool.map(is_changed, source_files)) if is_new]
+        list(pool.map(copy, changed))
+
+    deleted = [rel_path for rel_path in target_files if rel_path not in source_files]
+    for rel_path in deleted:
+        os.remove(os.path.join(target, rel_path))
+        cache.forget(os.path.join(target, rel_path))
+    if deleted:
+        remove_empty_folders(target)
+    cache.save()
+
+    copied_bytes = sum(source_files[rel_path] for rel_path in changed)
+    unchanged = len(source_files) - len(changed)
+    log.info(f"Dropbox sync {target}: {len(changed)} copied ({copied_bytes / 2**20:.1f} MB), "
+             f"{len(deleted)} deleted, {unchanged} unchanged in {time.time() - started:.1f}s")
+    return len(changed), len(deleted), unchanged, copied_bytes
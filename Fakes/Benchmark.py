@@ -0,0 +1,348 @@
+# End-to-end benchmark of the orchestrator on any Linux box, with stand-ins for Unity
+# (FakeUnityEditor.py), butler (FakeButler.py) and Telegram (FakeTelegramApi.py on a
+# local port). Creates N git projects with M targets each in a scratch folder, pushes
+# commits to them and runs every build through the real pipeline: git check and fetch,
+# checkout, Unity, patch notes, archive, and uploads to itch, Telegram and a Dropbox
+# folder. Reports throughput, p50/p95 per stage (from the Metrics records) and peak RSS:
+#   python Fakes/Benchmark.py --projects 4 --targets 3 --rounds 2 --file-size 1000000
+# Run it before and after a change to the scheduler, archiver or uploaders; --json
+# writes the numbers to a file for comparing runs.
+
+import argparse
+import json
+import logging
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+FAKES_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(FAKES_DIR))
+
+import ArtifactStore
+import DropboxSync
+import Fingerprint
+import Metrics
+import PatchNotes
+import Projects
+import StateStore
+import UnityRunner
+import autobuilder
+
+SINKS = ["itch", "telegram", "dropbox"]
+RSS_INTERVAL = 0.2  # Seconds between samples of the process tree
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Runs N projects x M targets through the whole build pipeline "
+                                                 "with fake Unity, butler and Telegram.")
+    parser.add_argument("--projects", type=int, default=2, help="git projects (N)")
+    parser.add_argument("--targets", type=int, default=2, help="build targets per project (M)")
+    parser.add_argument("--rounds", type=int, default=2, help="commits pushed to every project, one after another")
+    parser.add_argument("--build-seconds", type=float, default=1, help="fake Unity build time per target")
+    parser.add_argument("--files", type=int, default=20, help="files in every build folder")
+    parser.add_argument("--file-size", type=int, default=500_000, help="bytes per file")
+    parser.add_argument("--sinks", default=",".join(SINKS), help=f"destinations, any of {','.join(SINKS)}")
+    parser.add_argument("--zip", choices=["none", "zip", "7z"], default="zip", help="archive before upload")
+    parser.add_argument("--batch", action="store_true", help="build the targets of a project in one Unity launch")
+    parser.add_argument("--butler-speed", type=float, default=0, help="fake itch upload speed, bytes/s (0: instant)")
+    parser.add_argument("--telegram-delay", type=float, default=0, help="seconds the fake Telegram takes per request")
+    parser.add_argument("--max-jobs", type=int, default=autobuilder.Scheduler.MAX_WORKERS)
+    parser.add_argument("--max-unity", type=int, default=autobuilder.Scheduler.MAX_UNITY_PROCESSES)
+    parser.add_argument("--max-post", type=int, default=autobuilder.Scheduler.MAX_POST_WORKERS)
+    parser.add_argument("--workdir", help="scratch folder (default: a new temp folder, removed afterwards)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch folder")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="print the build logs")
+    return parser.parse_args()
+
+
+def git(args, cwd):
+    subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", *args],
+                   cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def create_repos(root):
+    # A bare remote, a clone to push commits from and the checkout the autobuilder builds
+    os.makedirs(root)
+    git(["init", "-q", "--bare", "-b", "main", "remote.git"], root)
+    git(["clone", "-q", "remote.git", "work"], root)
+    work = os.path.join(root, "work")
+    git(["checkout", "-q", "-b", "main"], work)
+    with open(os.path.join(work, ".gitignore"), "w") as f:
+        f.write("build_*\n")
+    push_commit(work, 0)
+    git(["clone", "-q", "remote.git", "checkout"], root)
+    return work, os.path.join(root, "checkout")
+
+
+def push_commit(work, number):
+    # Under Assets, so the build fingerprint changes and Unity really runs
+    os.makedirs(os.path.join(work, "Assets"), exist_ok=True)
+    with open(os.path.join(work, "Assets", "version.txt"), "w") as f:
+        f.write(f"{number}\n")
+    git(["add", "-A"], work)
+    git(["commit", "-q", "-m", f"Benchmark commit {number}"], work)
+    git(["push", "-q", "origin", "main"], work)
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_telegram(port, delay):
+    proc = subprocess.Popen([sys.executable, os.path.join(FAKES_DIR, "FakeTelegramApi.py")],
+                            env=dict(os.environ, FAKE_TELEGRAM_PORT=str(port), FAKE_TELEGRAM_DELAY=str(delay)),
+                            stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("the fake Telegram API did not start")
+
+
+def make_butler(workdir):
+    # The fake butler run by this interpreter, whatever python3 is in PATH
+    path = os.path.join(workdir, "bin", "butler")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(FAKES_DIR, "FakeButler.py")}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def redirect_state(workdir):
+    # Fingerprints, patch notes, logs and metrics of the fake projects stay in the scratch folder
+    state_dir = os.path.join(workdir, "state")
+    Fingerprint.FINGERPRINT_DIR = ArtifactStore.STORE_DIR = DropboxSync.CACHE_DIR = state_dir
+    PatchNotes.LAST_COMMIT_DIR = StateStore.STATE_DIR = state_dir
+    PatchNotes.ARTIFACTS_DIR = os.path.join(workdir, "artifacts")
+    UnityRunner.LOG_DIR = os.path.join(workdir, "log")
+    Metrics.RECORDS_FILE = os.path.join(workdir, "log", "metrics.jsonl")
+    Metrics.TEXTFILE = os.path.join(workdir, "log", "autobuilder.prom")
+    os.makedirs(os.path.join(workdir, "log"))
+    os.chdir(workdir)  # The target loggers write to ./log
+
+
+def make_project(index, checkout, args, sinks, telegram_url, dropbox_path):
+    name = f"bench{index}"
+    env = {
+        "REPO_PATH": checkout,
+        "BRANCH": "origin/main",
+        "UPLOAD_TO_ITCH": "itch" in sinks,
+        "ITCH_PROJECT": f"bench/{name}",
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "1",
+        "TELEGRAM_API_URL": telegram_url,
+        "DROPBOX_PATH": os.path.join(dropbox_path, name),
+        "BATCH_TARGETS": args.batch,
+    }
+    env_unity = {"UNITY_COMMAND": f'"{sys.executable}" "{os.path.join(FAKES_DIR, "FakeUnityEditor.py")}"'}
+    configs = [{
+        "BUILD_TARGET": f"Target{target}",
+        "BUILD_PATH": f"build_target{target}",
+        "ITCH_TARGET": f"target{target}",
+        "UPLOAD_TELEGRAM": "telegram" in sinks,
+        "UPLOAD_DROPBOX": "dropbox" in sinks,
+        "ZIP_BEFORE_UPLOAD": args.zip != "none",
+        "ZIP_METHOD": args.zip,
+    } for target in range(args.targets)]
+    return Projects.Project(name, types.SimpleNamespace(ENV=env, ENV_UNITY=env_unity, CONFIGS=configs))
+
+
+def quiet_console(project):
+    # Only warnings and errors on the console; the full logs are in <workdir>/log.
+    # The loggers are created here, before init_project logs anything
+    for target in ["Check"] + [config["BUILD_TARGET"] for config in project.CONFIGS]:
+        for handler in autobuilder.setup_logger(project.name, target).handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream in (sys.stderr, sys.stdout):
+                handler.setLevel(logging.WARNING)
+
+
+class RssSampler:
+    # Peak RSS of this process plus the processes it started (Unity, butler, git, 7-Zip),
+    # read from /proc. ru_maxrss cannot tell it: a child inherits the parent's peak at fork
+    def __init__(self, exclude=()):
+        self.exclude = set(exclude)  # The fake servers are not the orchestrator's memory
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True, name="rss")
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(RSS_INTERVAL):
+            self.peak = max(self.peak, self.get_tree_rss())
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.peak
+
+    def get_tree_rss(self):
+        parents = {}
+        for name in os.listdir("/proc"):
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    # The command name in parentheses may contain spaces
+                    parents[int(name)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (ValueError, OSError, IndexError):
+                pass
+        tree = {os.getpid()}
+        while True:
+            children = {pid for pid, ppid in parents.items() if ppid in tree and pid not in tree}
+            if not children:
+                break
+            tree |= children
+        total = 0
+        for pid in tree - self.exclude:
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, IndexError, ValueError):
+                pass  # Already gone
+        return total
+
+
+def wait_idle():
+    # Until the queue is empty and every build, with its post-processing, has finished
+    while True:
+        autobuilder.scheduler.wait_all()
+        snapshot = autobuilder.build_queue.get_snapshot()
+        if not snapshot["pending"] and not snapshot["running"]:
+            return
+        time.sleep(0.2)
+
+
+def get_stage_summary(records):
+    # stage -> {count, p50, p95, max} over all projects and targets
+    durations = {}
+    for (_, _, stage), values in Metrics.get_durations(records).items():
+        durations.setdefault(stage, []).extend(values)
+    return {stage: {"count": len(values), "p50": Metrics.get_percentile(values, 50),
+                    "p95": Metrics.get_percentile(values, 95), "max": max(values)}
+            for stage, values in sorted(durations.items())}
+
+
+def get_results(records, wall, tree_rss):
+    sent = sum(entry.get("bytes") or 0 for record in records for entry in record["stages"]
+               if entry["stage"].startswith("upload "))
+    done = [record for record in records if record["status"] == "done"]
+    return {
+        "wall_seconds": wall,
+        "builds": len(records),
+        "done": len(done),
+        "failed": len(records) - len(done),
+        "builds_per_minute": len(done) / wall * 60 if wall else 0,
+        "artifact_bytes": sum(record.get("artifact_bytes", 0) for record in done),
+        "bytes_sent": sent,
+        "sent_mb_per_second": sent / 2**20 / wall if wall else 0,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_tree_rss_mb": tree_rss / 2**20,
+        "stages": get_stage_summary(records),
+    }
+
+
+def print_results(results, args):
+    print(f"\n{args.projects} project(s) x {args.targets} target(s) x {args.rounds} round(s), "
+          f"{args.files} x {args.file_size} byte files, sinks: {args.sinks}, archive: {args.zip}"
+          f"{', batch' if args.batch else ''}")
+    print(f"Builds:      {results['done']} done, {results['failed']} not done in {results['wall_seconds']:.1f}s "
+          f"({results['builds_per_minute']:.1f} builds/min)")
+    print(f"Sent:        {results['bytes_sent'] / 2**20:.1f} MB ({results['sent_mb_per_second']:.1f} MB/s), "
+          f"artifacts {results['artifact_bytes'] / 2**20:.1f} MB")
+    print(f"Peak RSS:    orchestrator {results['peak_rss_mb']:.1f} MB, "
+          f"with child processes {results['peak_tree_rss_mb']:.1f} MB")
+    rows = [("stage", "count", "p50", "p95", "max")]
+    for stage, summary in results["stages"].items():
+        rows.append((stage, str(summary["count"]), f"{summary['p50']:.2f}s", f"{summary['p95']:.2f}s",
+                     f"{summary['max']:.2f}s"))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    print()
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def main():
+    args = parse_args()
+    sinks = [sink for sink in args.sinks.split(",") if sink]
+    unknown = [sink for sink in sinks if sink not in SINKS]
+    if unknown:
+        print(f"Unknown sink(s): {', '.join(unknown)}. Available: {', '.join(SINKS)}")
+        exit(1)
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="autobuild_bench_"))
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    telegram = None
+    try:
+        redirect_state(workdir)
+        os.environ.update(FAKE_UNITY_BUILD_SECONDS=str(args.build_seconds), FAKE_UNITY_FILES=str(args.files),
+                          FAKE_UNITY_FILE_SIZE=str(args.file_size), FAKE_BUTLER_SPEED=str(args.butler_speed),
+                          FAKE_BUTLER_DIR=os.path.join(workdir, "butler"), BUTLER_PATH=make_butler(workdir))
+        if "telegram" in sinks:
+            port = get_free_port()
+            telegram = start_telegram(port, args.telegram_delay)
+        telegram_url = f"http://127.0.0.1:{port}" if telegram else ""
+
+        print(f"Creating {args.projects} project(s) in {workdir}...")
+        works, projects = [], []
+        for index in range(args.projects):
+            work, checkout = create_repos(os.path.join(workdir, f"project{index}"))
+            works.append(work)
+            projects.append(make_project(index, checkout, args, sinks, telegram_url, os.path.join(workdir, "dropbox")))
+
+        autobuilder.CHECK_INTERVAL = 0  # Every check goes to the remote
+        autobuilder.init_scheduler(args.max_jobs, args.max_unity, args.max_post)
+        autobuilder.build_queue.quiet_period = 0
+        autobuilder.build_queue.start()
+        for project in projects:
+            if not args.verbose:
+                quiet_console(project)
+            autobuilder.init_project(project)
+
+        sampler = RssSampler([telegram.pid] if telegram else [])
+        started = time.time()
+        for number in range(1, args.rounds + 1):
+            print(f"Round {number}/{args.rounds}...")
+            for work in works:
+                push_commit(work, number)
+            for project in projects:
+                autobuilder.enqueue_git_checks(project)
+            wait_idle()
+        wall = time.time() - started
+        tree_rss = sampler.stop()
+
+        records = Metrics.load_records(Metrics.RECORDS_FILE) if os.path.exists(Metrics.RECORDS_FILE) else []
+        results = get_results(records, wall, tree_rss)
+        print_results(results, args)
+        for error in autobuilder.ALL_ERRORS:
+            print(f"Error: {error}")
+        if args.keep:
+            print(f"\nPer target: python Metrics.py {Metrics.RECORDS_FILE}")
+        if args.json:
+            with open(os.path.join(cwd, args.json), "w") as f:
+                json.dump(dict(results, args=vars(args)), f, indent=2)
+    finally:
+        if telegram:
+            telegram.terminate()
+            telegram.wait()
+        autobuilder.scheduler.shutdown()
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Stand-in for itch.io's butler, for trying uploads without an itch account or network.
+# Understands `butler push <folder or file> <user/game:channel> [--if-changed]` and
+# `butler whoami`, and prints the same summary lines as butler (see Butler.py).
+# Like butler it only "uploads" the files that changed since the last push to the
+# channel, so the patch sizes in the log are realistic. Point BUTLER_PATH at it:
+#   BUTLER_PATH=Fakes/FakeButler.py python autobuilder.py
+#
+# Behaviour is tuned with environment variables:
+#   FAKE_BUTLER_DIR            where the last push of every channel is remembered
+#                              (default: fake_butler in the temp folder)
+#   FAKE_BUTLER_DELAY          seconds per push on top of the upload (default 0)
+#   FAKE_BUTLER_SPEED          upload speed in bytes per second (default 0, instant)
+#   FAKE_BUTLER_FAIL_CHANNELS  comma separated channels whose push fails
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+STATE_DIR = os.environ.get("FAKE_BUTLER_DIR") or os.path.join(tempfile.gettempdir(), "fake_butler")
+DELAY = float(os.environ.get("FAKE_BUTLER_DELAY", 0))
+SPEED = float(os.environ.get("FAKE_BUTLER_SPEED", 0))
+FAIL_CHANNELS = [c for c in os.environ.get("FAKE_BUTLER_FAIL_CHANNELS", "").split(",") if c]
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_files(path):
+    # relative path -> (size, sha256)
+    if os.path.isfile(path):
+        return {os.path.basename(path): (os.path.getsize(path), hash_file(path))}
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            files[os.path.relpath(full_path, path)] = (os.path.getsize(full_path), hash_file(full_path))
+    return files
+
+
+def get_state_path(channel):
+    return os.path.join(STATE_DIR, channel.replace("/", "_").replace(":", "_") + ".json")
+
+
+def push(path, channel, if_changed):
+    if not os.path.exists(path):
+        print(f"Error: {path}: no such file or directory", file=sys.stderr)
+        return 1
+    files = list_files(path)
+    try:
+        with open(get_state_path(channel)) as f:
+            last = {name: tuple(entry) for name, entry in json.load(f).items()}
+        print(f"∙ For channel `{channel.rsplit(':', 1)[-1]}`: last build found, downloading its signature")
+    except (OSError, ValueError):
+        last = {}
+        print(f"∙ For channel `{channel.rsplit(':', 1)[-1]}`: pushing first build")
+
+    total = sum(size for size, _ in files.values())
+    changed = sum(size for name, (size, digest) in files.items() if last.get(name, (None, None))[1] != digest)
+    if if_changed and files == last:
+        print("No changes and --if-changed used, not pushing anything")
+        return 0
+
+    print(f"∙ Pushing {format_size(total)} ({len(files)} files, 0 dirs, 0 symlinks)")
+    time.sleep(DELAY + (changed / SPEED if SPEED else 0))
+    if channel.rsplit(":", 1)[-1] in FAIL_CHANNELS:
+        print(f"Error: 403 could not push to {channel}", file=sys.stderr)
+        return 1
+    savings = 100 * (1 - changed / total) if total else 100
+    print(f"✓ Added {format_size(changed)} fresh data")
+    print(f"✓ {format_size(changed)} patch ({savings:.2f}% savings)")
+    print("∙ Build is now processing, should be up in a bit.")
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(get_state_path(channel), "w") as f:
+        json.dump(files, f)
+    return 0
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["whoami"]:
+        print("You're logged in as fake-butler")
+        return 0
+    if args[:1] == ["push"] and len(args) >= 3:
+        return push(args[1], args[2], "--if-changed" in args[3:])
+    print(f"Unknown command: {' '.join(args)}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
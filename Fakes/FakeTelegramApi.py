@@ -0,0 +1,123 @@
+# Stand-in for the Telegram Bot API, for trying uploads without a bot or network.
+# Answers sendDocument and sendMediaGroup like api.telegram.org does:
+#   python Fakes/FakeTelegramApi.py
+# and point ENV["TELEGRAM_API_URL"] at http://127.0.0.1:8081 (any token and chat id work).
+#
+# Behaviour is tuned with environment variables:
+#   FAKE_TELEGRAM_PORT          port to listen on (default 8081)
+#   FAKE_TELEGRAM_DELAY         seconds before answering a request (default 0)
+#   FAKE_TELEGRAM_RATE_LIMIT    answer every Nth request with 429 (default 0, never)
+#   FAKE_TELEGRAM_RETRY_AFTER   retry_after of those answers (default 1)
+#   FAKE_TELEGRAM_MAX_FILE_SIZE bytes per file above which the request fails (default 50 MB)
+#   FAKE_TELEGRAM_DIR           save received files here (default: only count them)
+
+import json
+import os
+import threading
+import time
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT = int(os.environ.get("FAKE_TELEGRAM_PORT", 8081))
+DELAY = float(os.environ.get("FAKE_TELEGRAM_DELAY", 0))
+RATE_LIMIT = int(os.environ.get("FAKE_TELEGRAM_RATE_LIMIT", 0))
+RETRY_AFTER = int(os.environ.get("FAKE_TELEGRAM_RETRY_AFTER", 1))
+MAX_FILE_SIZE = int(os.environ.get("FAKE_TELEGRAM_MAX_FILE_SIZE", 50 * 2**20))
+SAVE_DIR = os.environ.get("FAKE_TELEGRAM_DIR")
+
+lock = threading.Lock()
+stats = {"requests": 0, "rate_limited": 0, "files": 0, "bytes": 0}
+next_message_id = [1]
+
+
+def log(message):
+    print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+
+def parse_form(content_type, body):
+    # {name: (filename or None, bytes)}
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    form = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        form[name] = (part.get_filename(), part.get_payload(decode=True))
+    return form
+
+
+def get_document(form, name):
+    filename, data = form[name]
+    with lock:
+        message_id = next_message_id[0]
+        next_message_id[0] += 1
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+    if SAVE_DIR:
+        os.makedirs(SAVE_DIR, exist_ok=True)
+        with open(os.path.join(SAVE_DIR, os.path.basename(filename or name)), "wb") as f:
+            f.write(data)
+    log(f"Received {filename} ({len(data)} bytes)")
+    return {"message_id": message_id, "date": int(time.time()),
+            "document": {"file_name": filename, "file_size": len(data)}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        # /bot<token>/<method>
+        method = self.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with lock:
+            stats["requests"] += 1
+            limited = RATE_LIMIT and stats["requests"] % RATE_LIMIT == 0
+            if limited:
+                stats["rate_limited"] += 1
+        if DELAY:
+            time.sleep(DELAY)
+        if limited:
+            return self.reply(429, {"ok": False, "error_code": 429,
+                                    "description": f"Too Many Requests: retry after {RETRY_AFTER}",
+                                    "parameters": {"retry_after": RETRY_AFTER}})
+
+        try:
+            form = parse_form(self.headers.get("Content-Type", ""), body)
+        except Exception as e:
+            return self.reply(400, {"ok": False, "error_code": 400, "description": f"Bad Request: {e}"})
+        if not form.get("chat_id", (None, b""))[1]:
+            return self.reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: chat_id is empty"})
+        if any(filename is not None and len(data) > MAX_FILE_SIZE for filename, data in form.values()):
+            return self.reply(413, {"ok": False, "error_code": 413, "description": "Request Entity Too Large"})
+
+        if method == "sendDocument" and "document" in form:
+            return self.reply(200, {"ok": True, "result": get_document(form, "document")})
+        if method == "sendMediaGroup" and "media" in form:
+            media = json.loads(form["media"][1])
+            if not 2 <= len(media) <= 10:
+                return self.reply(400, {"ok": False, "error_code": 400,
+                                        "description": "Bad Request: wrong number of media"})
+            result = [get_document(form, item["media"][len("attach://"):]) for item in media]
+            return self.reply(200, {"ok": True, "result": result})
+        self.reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def reply(self, code, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=PORT):
+    # Started server on a background thread, for scripts that run it in-process
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    log(f"Fake Telegram Bot API on http://127.0.0.1:{PORT}")
+    ThreadingHTTPServer(("127.0.0.1", PORT), Handler).serve_forever()
@@ -0,0 +1,174 @@
+# Stand-in for the Unity editor, for trying the orchestrator without a Unity install.
+# Understands the same command line as ForUnity/Editor/Builder.cs and BuildServer.cs:
+#   -executeMethod Builder.Build -buildTarget WebGL -output path
+#   -executeMethod Builder.BuildMany -buildTargets WebGL,Win64 -outputs "a;b" -resultFile path
+#   -executeMethod BuildServer.Serve -workerPort 9300 -workerToken abc
+# Point ENV_UNITY["UNITY_COMMAND"] at it: f'"{sys.executable}" Fakes/FakeUnityEditor.py'
+#
+# Behaviour is tuned with environment variables:
+#   FAKE_UNITY_BUILD_SECONDS  time spent "building" one target (default 1)
+#   FAKE_UNITY_FILES          files written per target (default 10)
+#   FAKE_UNITY_FILE_SIZE      bytes per file (default 100000)
+#   FAKE_UNITY_FAIL_TARGETS   comma separated targets that fail
+#   FAKE_UNITY_COMPILE_ERROR_TARGETS  targets that log a compile error, then take long to exit
+#   FAKE_UNITY_HANG_TARGETS   targets that stop logging and never finish (like a wedged IL2CPP)
+
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+BUILD_SECONDS = float(os.environ.get("FAKE_UNITY_BUILD_SECONDS", 1))
+FILES = int(os.environ.get("FAKE_UNITY_FILES", 10))
+FILE_SIZE = int(os.environ.get("FAKE_UNITY_FILE_SIZE", 100_000))
+FAIL_TARGETS = [t for t in os.environ.get("FAKE_UNITY_FAIL_TARGETS", "").split(",") if t]
+COMPILE_ERROR_TARGETS = [t for t in os.environ.get("FAKE_UNITY_COMPILE_ERROR_TARGETS", "").split(",") if t]
+HANG_TARGETS = [t for t in os.environ.get("FAKE_UNITY_HANG_TARGETS", "").split(",") if t]
+
+
+def get_arg(name, default=None):
+    args = sys.argv
+    for index in range(len(args) - 1):
+        if args[index] == name:
+            return args[index + 1]
+    return default
+
+
+def log(message):
+    log_file = get_arg("-logFile")
+    line = f"{time.strftime('%H:%M:%S')} {message}\n"
+    if log_file:
+        with open(log_file, "a") as f:
+            f.write(line)
+    else:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+def build(target, output):
+    # The same phase lines a real editor writes, see UnityRunner.PHASES
+    log("Start importing Assets")
+    log("[ScriptCompilation] Requested script compilation")
+    if target in COMPILE_ERROR_TARGETS:
+        log("Assets/Scripts/Player.cs(12,5): error CS0103: The name 'speed' does not exist in the current context")
+        log("Scripts have compiler errors.")
+        time.sleep(600)
+        return False
+    log(f"Build Start: {target}")
+    if target in HANG_TARGETS:
+        log("Building native binary with IL2CPP...")
+        time.sleep(3600)
+    time.sleep(BUILD_SECONDS * 0.8)
+    log("Compressing build files")
+    time.sleep(BUILD_SECONDS * 0.2)
+    if target in FAIL_TARGETS:
+        log(f"Build Failed: {target}")
+        return False
+
+    if os.path.exists(output):
+        for name in os.listdir(output):
+            path = os.path.join(output, name)
+            if os.path.isfile(path):
+                os.remove(path)
+    os.makedirs(output, exist_ok=True)
+    for index in range(FILES):
+        with open(os.path.join(output, f"data_{index}.bin"), "wb") as f:
+            f.write(os.urandom(FILE_SIZE // 2) + bytes(FILE_SIZE - FILE_SIZE // 2))
+    log(f"Build Done: {target}")
+    return True
+
+
+def build_one():
+    target = get_arg("-buildTarget")
+    output = get_arg("-output") or os.path.join(get_arg("-projectPath", "."), target.lower())
+    return 0 if build(target, output) else 1
+
+
+def build_many():
+    targets = [t for t in get_arg("-buildTargets", "").split(",") if t]
+    outputs = get_arg("-outputs", "").split(";")
+    results = []
+    for index, target in enumerate(targets):
+        success = build(target, outputs[index])
+        results.append(f"{target}={'Succeeded' if success else 'Failed'}")
+
+    result_file = get_arg("-resultFile")
+    if result_file:
+        with open(result_file, "w") as f:
+            f.write("\n".join(results))
+    return 0 if all(r.endswith("Succeeded") for r in results) else 1
+
+
+class BuildServer:
+    def __init__(self):
+        self.statuses = {}
+        self.queue = []
+        self.lock = threading.Condition()
+        self.running = True
+
+    def handle(self, request):
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "status": "pong", "token": get_arg("-workerToken", "")}
+        if command == "build":
+            with self.lock:
+                self.statuses[request["id"]] = "queued"
+                self.queue.append(request)
+                self.lock.notify()
+            return {"ok": True, "status": "queued", "id": request["id"]}
+        if command == "status":
+            return {"ok": True, "status": self.statuses.get(request.get("id"), "unknown"), "id": request.get("id")}
+        if command == "quit":
+            with self.lock:
+                self.running = False
+                self.lock.notify()
+            return {"ok": True, "status": "quitting"}
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def work(self):
+        # Main "editor" thread: builds one request at a time
+        while True:
+            with self.lock:
+                while self.running and not self.queue:
+                    self.lock.wait()
+                if not self.running:
+                    return
+                request = self.queue.pop(0)
+                self.statuses[request["id"]] = "running"
+            success = build(request["target"], request["output"])
+            self.statuses[request["id"]] = "succeeded" if success else "failed"
+
+
+def serve():
+    server = BuildServer()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline() or b"{}")
+            self.wfile.write((json.dumps(server.handle(request)) + "\n").encode("utf-8"))
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer(("127.0.0.1", int(get_arg("-workerPort"))), Handler) as tcp:
+        threading.Thread(target=tcp.serve_forever, daemon=True).start()
+        log(f"[BuildServer] Listening on port {get_arg('-workerPort')}")
+        server.work()
+        tcp.shutdown()
+    return 0
+
+
+def main():
+    method = get_arg("-executeMethod")
+    if method == "Builder.Build":
+        return build_one()
+    if method == "Builder.BuildMany":
+        return build_many()
+    if method == "BuildServer.Serve":
+        return serve()
+    log(f"Unknown -executeMethod: {method}")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+import RepoPoller
+import StateStore
+
+# Fingerprint of everything that goes into a player build of one target:
+# the git tree hashes of the Unity input folders (no file is read or rehashed),
+# the Unity install from ENV_UNITY and the target's config dict.
+# A commit that only touches README, CI or tooling files keeps the fingerprint,
+# so the Unity step can be skipped when the last build's output is still there.
+
+INPUT_FOLDERS = ["Assets", "Packages", "ProjectSettings"]
+FINGERPRINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints")
+
+
+def get_fingerprint(repo_path, commit, config, ENV_UNITY):
+    tree = RepoPoller.get_repo(repo_path).commit(commit).tree
+    parts = []
+    for folder in INPUT_FOLDERS:
+        try:
+            parts.append(f"{folder}={(tree / folder).hexsha}")
+        except KeyError:
+            parts.append(f"{folder}=missing")
+    parts.append(json.dumps(ENV_UNITY, sort_keys=True, default=str))
+    parts.append(json.dumps(config, sort_keys=True, default=str))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def get_path(key):
+    # File of the fingerprint from before the state store, still read if the store has none
+    project, target = key
+    name = os.path.basename(str(project).strip("\\/"))
+    return os.path.join(FINGERPRINT_DIR, f"{name}_{target}.txt")
+
+
+def load(key):
+    fingerprint = StateStore.get_fingerprint(key)
+    if fingerprint:
+        return fingerprint
+    try:
+        with open(get_path(key)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def save(key, fingerprint):
+    StateStore.set_fingerprint(key, fingerprint)
+
+
+def is_unchanged(key, fingerprint, output_path):
+    # The last successful build had the same inputs and its output was not deleted since
+    return fingerprint == load(key) and os.path.isdir(output_path) and bool(os.listdir(output_path))
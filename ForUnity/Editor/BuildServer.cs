@@ -0,0 +1,217 @@
+using UnityEditor;
+using UnityEngine;
+using System;
+using System.Collections.Concurrent;
+using System.IO;
+using System.Net;
+using System.Net.Sockets;
+using System.Text;
+using System.Threading;
+
+// Долгоживущий batchmode-редактор, принимающий запросы на сборку от autobuilder.py.
+// Запуск: Unity -batchmode -nographics -projectPath <path> -executeMethod BuildServer.Serve -workerPort 9123 -workerToken <token>
+// Протокол: одна JSON-строка запроса на соединение, одна JSON-строка ответа.
+//   {"command":"ping"}                                             -> pong с -workerToken этого запуска
+//   {"command":"build","id":"1","target":"WebGL","output":"path"}  -> сборка ставится в очередь
+//   {"command":"status","id":"1"}                                  -> queued / running / succeeded / failed
+//   {"command":"quit"}
+// Запрос на сборку переживает domain reload (хранится в SessionState), поэтому
+// AssetDatabase.Refresh с перекомпиляцией скриптов не теряет его.
+[InitializeOnLoad]
+public static class BuildServer
+{
+    [Serializable]
+    private class Request
+    {
+        public string command;
+        public string id;
+        public string target;
+        public string output;
+    }
+
+    [Serializable]
+    private class Response
+    {
+        public bool ok;
+        public string status;
+        public string id;
+        public string error;
+        public string token;
+    }
+
+    private const string WorkerPortParam = "-workerPort";
+    private const string WorkerTokenParam = "-workerToken";
+    private const string PendingKey = "BuildServer.Pending";
+    private const string StatusesKey = "BuildServer.Statuses";
+
+    private static readonly ConcurrentQueue<Request> Incoming = new();
+    private static readonly ConcurrentDictionary<string, string> Statuses = new();
+    private static TcpListener _listener;
+    private static Thread _thread;
+    private static bool _refreshed;
+
+    static BuildServer()
+    {
+        // После domain reload слушатель поднимается заново
+        if (GetPort() <= 0)
+            return;
+
+        LoadStatuses();
+        Start();
+    }
+
+    public static void Serve()
+    {
+        if (GetPort() <= 0)
+        {
+            Debug.LogError($"[BuildServer] Укажите порт: {WorkerPortParam} <port>");
+            EditorApplication.Exit(1);
+            return;
+        }
+
+        Start();
+    }
+
+    private static void Start()
+    {
+        if (_listener != null)
+            return;
+
+        _listener = new TcpListener(IPAddress.Loopback, GetPort());
+        _listener.Server.SetSocketOption(SocketOptionLevel.Socket, SocketOptionName.ReuseAddress, true);
+        _listener.Start();
+        _thread = new Thread(Listen) { IsBackground = true };
+        _thread.Start();
+
+        EditorApplication.update += Update;
+        AssemblyReloadEvents.beforeAssemblyReload += Stop;
+        Debug.Log($"[BuildServer] Listening on port {GetPort()}");
+    }
+
+    private static void Stop()
+    {
+        EditorApplication.update -= Update;
+        _listener?.Stop();
+        _listener = null;
+    }
+
+    private static void Listen()
+    {
+        while (_listener != null)
+        {
+            try
+            {
+                using var client = _listener.AcceptTcpClient();
+                using var stream = client.GetStream();
+                using var reader = new StreamReader(stream, Encoding.UTF8);
+                using var writer = new StreamWriter(stream, new UTF8Encoding(false)) { AutoFlush = true };
+
+                var request = JsonUtility.FromJson<Request>(reader.ReadLine() ?? "{}");
+                writer.WriteLine(JsonUtility.ToJson(Handle(request)));
+            }
+            catch (Exception e) when (e is SocketException || e is ObjectDisposedException || e is InvalidOperationException)
+            {
+                if (_listener == null)
+                    return;
+            }
+            catch (Exception e)
+            {
+                Debug.LogException(e);
+            }
+        }
+    }
+
+    // Фоновый поток: только очередь и чтение статуса, Unity API не трогаем
+    private static Response Handle(Request request)
+    {
+        switch (request.command)
+        {
+            case "ping":
+                return new Response { ok = true, status = "pong", token = GetArg(WorkerTokenParam) };
+            case "build":
+                Statuses[request.id ?? string.Empty] = "queued";
+                Incoming.Enqueue(request);
+                return new Response { ok = true, status = "queued", id = request.id };
+            case "status":
+                return new Response { ok = true, status = GetStatus(request.id), id = request.id };
+            case "quit":
+                Incoming.Enqueue(request);
+                return new Response { ok = true, status = "quitting" };
+            default:
+                return new Response { ok = false, error = $"Unknown command: {request.command}" };
+        }
+    }
+
+    // Главный поток редактора
+    private static void Update()
+    {
+        while (Incoming.TryDequeue(out var request))
+        {
+            if (request.command == "quit")
+            {
+                Stop();
+                EditorApplication.Exit(0);
+                return;
+            }
+
+            SetStatus(request.id, "queued");
+            SessionState.SetString(PendingKey, JsonUtility.ToJson(request));
+            _refreshed = false;
+        }
+
+        var pending = SessionState.GetString(PendingKey, string.Empty);
+        if (string.IsNullOrEmpty(pending) || EditorApplication.isCompiling || EditorApplication.isUpdating)
+            return;
+
+        var build = JsonUtility.FromJson<Request>(pending);
+        if (!_refreshed)
+        {
+            // Подтянуть изменения после git sync; возможна перекомпиляция и domain reload
+            _refreshed = true;
+            AssetDatabase.Refresh();
+            return;
+        }
+
+        SessionState.EraseString(PendingKey);
+        SetStatus(build.id, "running");
+        var success = Builder.BuildByName(build.target, build.output);
+        SetStatus(build.id, success ? "succeeded" : "failed");
+    }
+
+    private static string GetStatus(string id) =>
+        id != null && Statuses.TryGetValue(id, out var status) ? status : "unknown";
+
+    // SessionState доступен только из главного потока, поэтому статусы дублируются в словаре
+    private static void SetStatus(string id, string status)
+    {
+        Statuses[id ?? string.Empty] = status;
+        var lines = new StringBuilder();
+        foreach (var pair in Statuses)
+            lines.Append(pair.Key).Append('=').Append(pair.Value).Append('\n');
+        SessionState.SetString(StatusesKey, lines.ToString());
+    }
+
+    private static void LoadStatuses()
+    {
+        foreach (var line in SessionState.GetString(StatusesKey, string.Empty).Split('\n'))
+        {
+            var separator = line.IndexOf('=');
+            if (separator > 0)
+                Statuses[line.Substring(0, separator)] = line.Substring(separator + 1);
+        }
+    }
+
+    private static int GetPort() => int.TryParse(GetArg(WorkerPortParam), out var port) ? port : 0;
+
+    private static string GetArg(string name)
+    {
+        var args = Environment.GetCommandLineArgs();
+        for (var index = 0; index < args.Length - 1; index++)
+        {
+            if (args[index] == name)
+                return args[index + 1];
+        }
+
+        return null;
+    }
+}
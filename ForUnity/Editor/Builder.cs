@@ -30,6 +30,10 @@ public class Builder
     };
 
     private const string BuildTargetParam = "-buildTarget";
+    private const string BuildTargetsParam = "-buildTargets";
+    private const string OutputParam = "-output";
+    private const string OutputsParam = "-outputs";
+    private const string ResultFileParam = "-resultFile";
 
     [MenuItem("Build/Build Android")]
     public static void BuildAndroid() => BuildWithParam(BuildTarget.Android);
@@ -46,17 +50,54 @@ public class Builder
     [MenuItem("Build/Build Webgl")]
     public static void BuildWebgl() => BuildWithParam(BuildTarget.WebGL);
 
-    public static void Build() => BuildWithParam(GetPlatform(Environment.GetCommandLineArgs()));
+    public static void Build()
+    {
+        var args = Environment.GetCommandLineArgs();
+        if (!BuildWithParam(GetPlatform(args), GetArg(args, OutputParam)))
+            EditorApplication.Exit(1);
+    }
 
-    private static void BuildWithParam(string buildTarget)
+    // -buildTargets WebGL,Win64 -outputs "path1;path2" -resultFile "path"
+    // Несколько платформ за один запуск редактора; результат по каждой пишется в -resultFile
+    public static void BuildMany()
+    {
+        var args = Environment.GetCommandLineArgs();
+        var targets = (GetArg(args, BuildTargetsParam) ?? string.Empty)
+            .Split(new[] { ',' }, StringSplitOptions.RemoveEmptyEntries);
+        var outputs = (GetArg(args, OutputsParam) ?? string.Empty).Split(';');
+
+        var results = new List<string>();
+        var failed = false;
+
+        for (var index = 0; index < targets.Length; index++)
+        {
+            var target = targets[index].Trim();
+            var output = index < outputs.Length && outputs[index].Length > 0 ? outputs[index] : null;
+            var success = BuildWithParam(target, output);
+            results.Add($"{target}={(success ? "Succeeded" : "Failed")}");
+            failed |= !success;
+        }
+
+        var resultFile = GetArg(args, ResultFileParam);
+        if (!string.IsNullOrEmpty(resultFile))
+            File.WriteAllLines(resultFile, results);
+
+        if (failed)
+            EditorApplication.Exit(1);
+    }
+
+    // Используется BuildServer для сборки по запросу
+    public static bool BuildByName(string buildTarget, string output) => BuildWithParam(buildTarget, output);
+
+    private static bool BuildWithParam(string buildTarget, string output = null)
     {
         if (string.IsNullOrEmpty(buildTarget) || !BuildParams.TryGetValue(buildTarget, out var param))
         {
             Debug.LogError($"[UnifiedBuilder] Неизвестная платформа: [{buildTarget}]. Используйте -buildTarget <BuildTarget>");
-            return;
+            return false;
         }
 
-        BuildWithParam(param);
+        return BuildWithParam(param, output);
     }
 
     private static void BuildWithParam(BuildTarget buildTarget)
@@ -68,14 +109,15 @@ public class Builder
         BuildWithParam(param);
     }
 
-    private static void BuildWithParam(BuildParam param)
+    private static bool BuildWithParam(BuildParam param, string output = null)
     {
         Debug.Log($"Build Start: {param.BuildTarget}");
-        Build(param.BuildTarget, param.Folder, param.GetExeName());
-        Debug.Log($"Build Done: {param.BuildTarget}");
+        var success = Build(param.BuildTarget, output ?? param.Folder, param.GetExeName());
+        Debug.Log($"Build {(success ? "Done" : "Failed")}: {param.BuildTarget}");
+        return success;
     }
 
-    private static void Build(BuildTarget buildTarget, string buildFolder, string exeName = null)
+    private static bool Build(BuildTarget buildTarget, string buildFolder, string exeName = null)
     {
         if (Directory.Exists(buildFolder)) 
             Directory.Delete(buildFolder, true);
@@ -84,13 +126,15 @@ public class Builder
         
         var finalPath = exeName == null ? buildFolder : Path.Combine(buildFolder, exeName);
 
-        BuildPipeline.BuildPlayer
+        var report = BuildPipeline.BuildPlayer
         (
             GetEnabledScenes(),
             finalPath,
             buildTarget,
             GetBuildOptions()
         );
+
+        return report.summary.result == UnityEditor.Build.Reporting.BuildResult.Succeeded;
     }
     
     private static string[] GetEnabledScenes()
@@ -107,11 +151,13 @@ public class Builder
         return BuildOptions.Development | BuildOptions.AllowDebugging;
     }
     
-    private static string GetPlatform(string[] args)
+    private static string GetPlatform(string[] args) => GetArg(args, BuildTargetParam);
+
+    private static string GetArg(string[] args, string name)
     {
-        for (var index = 0; index < args.Length; index++)
+        for (var index = 0; index < args.Length - 1; index++)
         {
-            if (args[index] == BuildTargetParam)
+            if (args[index] == name)
                 return args[index + 1];
         }
 
@@ -0,0 +1,125 @@
+import os
+import shutil
+import time
+
+# Keeps a separate Unity Library folder per build target, so a platform switch
+# does not reimport and recompress every asset.
+# Snapshots are moved with a rename (same drive only), never copied.
+# The live Library is tagged with its target; it is stashed into the cache only when
+# another target needs the project, so consecutive builds of one target cost nothing.
+
+MARKER_FILE = "autobuild_target.txt"
+SIZE_FILE = "autobuild_size.txt"
+
+
+def get_folder_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class LibraryCache:
+    def __init__(self, project_path, root=None, max_bytes=None):
+        self.project_path = project_path
+        self.library = os.path.join(project_path, "Library")
+        self.root = root or f"{project_path.rstrip(chr(92) + '/')}_library_cache"
+        self.max_bytes = max_bytes
+
+    def get_snapshot_path(self, target):
+        return os.path.join(self.root, target)
+
+    def get_live_target(self):
+        try:
+            with open(os.path.join(self.library, MARKER_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def swap_in(self, target, log):
+        live_target = self.get_live_target()
+        if live_target == target:
+            log.info(f"'{self.project_path}' Library cache hit for {target} (already in place)")
+            return True
+
+        if os.path.isdir(self.library):
+            if live_target is None:
+                # Untagged Library from a manual build: adopt it instead of starting from scratch
+                log.info(f"'{self.project_path}' Library cache miss for {target}, reusing untagged Library")
+                self._write_marker(target)
+                return False
+            self._stash(live_target, log)
+
+        snapshot = self.get_snapshot_path(target)
+        if os.path.isdir(snapshot):
+            os.replace(snapshot, self.library)
+            log.info(f"'{self.project_path}' Library cache hit for {target}")
+            hit = True
+        else:
+            log.info(f"'{self.project_path}' Library cache miss for {target}, full import expected")
+            os.makedirs(self.library, exist_ok=True)
+            hit = False
+
+        self._write_marker(target)
+        return hit
+
+    def save_back(self, target, log):
+        # The Library stays in place for the next build of the same target
+        if os.path.isdir(self.library):
+            self._write_marker(target)
+        self.enforce_size_cap(log)
+
+    def enforce_size_cap(self, log):
+        if not self.max_bytes or not os.path.isdir(self.root):
+            return
+
+        snapshots = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                snapshots.append((os.path.getmtime(path), self._read_size(path), path))
+
+        total = sum(size for _, size, _ in snapshots)
+        # Least recently used snapshots go first
+        for _, size, path in sorted(snapshots):
+            if total <= self.max_bytes:
+                break
+            log.info(f"'{self.project_path}' Library cache over limit, evicting {path} ({size / 2**30:.1f} GB)")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _stash(self, live_target, log):
+        os.makedirs(self.root, exist_ok=True)
+        snapshot = self.get_snapshot_path(live_target)
+        if os.path.isdir(snapshot):
+            shutil.rmtree(snapshot)
+
+        with open(os.path.join(self.library, SIZE_FILE), 'w') as f:
+            f.write(str(get_folder_size(self.library)))
+
+        try:
+            os.replace(self.library, snapshot)
+        except OSError as e:
+            # Rename only works inside one drive; a copy would cost more than the reimport
+            log.warning(f"'{self.project_path}' Cannot move Library to cache ({e}), dropping it")
+            shutil.rmtree(self.library, ignore_errors=True)
+            return
+
+        now = time.time()
+        os.utime(snapshot, (now, now))
+        log.info(f"'{self.project_path}' Library for {live_target} saved to cache")
+
+    def _write_marker(self, target):
+        with open(os.path.join(self.library, MARKER_FILE), 'w') as f:
+            f.write(target)
+
+    def _read_size(self, path):
+        try:
+            with open(os.path.join(path, SIZE_FILE)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return get_folder_size(path)
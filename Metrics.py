@@ -0,0 +1,216 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Per-build timing records. Every stage of a build (pull, Unity, patch notes, archive,
+# one per upload destination) is timed under the build's (project, target) key, with
+# sizes, bytes sent and cache hits where the stage knows them. When the scheduler sets
+# the key's final stage the record is appended to a JSON lines file, and a Prometheus
+# text-format file (for node_exporter's textfile collector) is rewritten with the
+# latest values. `python Metrics.py` prints p50/p95 of every stage per target.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDS_FILE = os.path.join(SCRIPT_DIR, "log", "metrics.jsonl")
+TEXTFILE = os.path.join(SCRIPT_DIR, "log", "autobuilder.prom")
+FINISHED_STAGES = ("done", "failed", "cancelled", "skipped")
+
+_records = {}            # (project, target) -> record of the build in progress
+_last = {}               # (project, target) -> last finished record
+_counts = Counter()      # (project, target, status) -> builds since start
+_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def get_names(key):
+    project, target = key
+    return os.path.basename(str(project).strip("\\/")), target
+
+
+def get_record(key):
+    # Call with _lock held; the first stage of a build opens its record
+    if key not in _records:
+        project, target = get_names(key)
+        _records[key] = {"project": project, "target": target, "start": time.time(), "stages": []}
+    return _records[key]
+
+
+def set_fields(keys, **fields):
+    # Build-level fields, e.g. commit or artifact_bytes
+    with _lock:
+        for key in keys:
+            get_record(key).update(fields)
+
+
+def add(keys, name, started, ended=None, **fields):
+    # A stage timed by the caller
+    ended = time.time() if ended is None else ended
+    entry = dict(fields, stage=name, start=started, end=ended, duration=ended - started)
+    with _lock:
+        for key in keys:
+            get_record(key)["stages"].append(dict(entry))
+
+
+@contextmanager
+def stage(keys, name, **fields):
+    # Times the block as one stage of every key's build; the block may add to the yielded
+    # dict, or rename the stage through its "stage"
+    entry = dict(fields)
+    started = time.time()
+    try:
+        yield entry
+        entry.setdefault("ok", True)
+    except BaseException as e:
+        entry["ok"] = False
+        entry.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        add(keys, entry.pop("stage", name), started, **entry)
+
+
+def on_stage(key, stage_name):
+    # Scheduler callback: a final stage closes the key's record
+    if stage_name not in FINISHED_STAGES:
+        return
+    with _lock:
+        record = _records.pop(key, None)
+    if record is None:
+        return
+    record["end"] = time.time()
+    record["duration"] = record["end"] - record["start"]
+    record["status"] = stage_name
+    write(record)
+
+
+def write(record):
+    with _write_lock:
+        os.makedirs(os.path.dirname(RECORDS_FILE), exist_ok=True)
+        with open(RECORDS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        key = (record["project"], record["target"])
+        _last[key] = record
+        _counts[key + (record["status"],)] += 1
+        if TEXTFILE:
+            write_textfile(TEXTFILE)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_labels(**labels):
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def get_textfile_lines():
+    # Call with _write_lock held
+    metrics = {
+        "autobuilder_builds_total": ("counter", "Finished builds by status since the autobuilder started", []),
+        "autobuilder_build_duration_seconds": ("gauge", "Duration of the last finished build", []),
+        "autobuilder_build_timestamp_seconds": ("gauge", "End time of the last finished build", []),
+        "autobuilder_stage_duration_seconds": ("gauge", "Duration of each stage of the last finished build", []),
+        "autobuilder_stage_bytes": ("gauge", "Bytes produced or sent by each stage of the last finished build", []),
+        "autobuilder_stage_cache_hit": ("gauge", "1 if the stage of the last finished build was skipped as cached", []),
+    }
+    for (project, target, status), count in sorted(_counts.items()):
+        metrics["autobuilder_builds_total"][2].append((get_labels(project=project, target=target, status=status), count))
+    for (project, target), record in sorted(_last.items()):
+        labels = get_labels(project=project, target=target)
+        metrics["autobuilder_build_duration_seconds"][2].append((labels, record["duration"]))
+        metrics["autobuilder_build_timestamp_seconds"][2].append((labels, record["end"]))
+        # A stage that ran more than once (pull of a batch) keeps its last value
+        for entry in record["stages"]:
+            labels = get_labels(project=project, target=target, stage=entry["stage"])
+            metrics["autobuilder_stage_duration_seconds"][2].append((labels, entry["duration"]))
+            if "bytes" in entry:
+                metrics["autobuilder_stage_bytes"][2].append((labels, entry["bytes"]))
+            metrics["autobuilder_stage_cache_hit"][2].append((labels, int(entry.get("cache_hit", False))))
+
+    lines = []
+    for name, (kind, help_text, samples) in metrics.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        samples = dict(samples)  # Last one wins for a repeated label set
+        lines += [f"{name}{labels} {value}" for labels, value in samples.items()]
+    return lines
+
+
+def write_textfile(path):
+    # node_exporter may read it at any moment, so it is replaced, never rewritten in place
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("\n".join(get_textfile_lines()) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def load_records(path):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass  # A line cut off by a crash
+    return records
+
+
+def get_percentile(values, percent):
+    # Nearest rank
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def get_durations(records):
+    # (project, target, stage) -> durations; "build" is the whole build
+    durations = {}
+    for record in records:
+        key = (record["project"], record["target"])
+        durations.setdefault(key + ("build",), []).append(record["duration"])
+        for entry in record["stages"]:
+            if not entry.get("cache_hit"):
+                durations.setdefault(key + (entry["stage"],), []).append(entry["duration"])
+    return durations
+
+
+def print_summary(records):
+    durations = get_durations(records)
+    rows = [("project", "target", "stage", "count", "p50", "p95", "max")]
+    for (project, target, stage_name), values in sorted(durations.items()):
+        rows.append((project, target, stage_name, str(len(values)), f"{get_percentile(values, 50):.1f}s",
+                     f"{get_percentile(values, 95):.1f}s", f"{max(values):.1f}s"))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints p50/p95 stage durations of the recorded builds.")
+    parser.add_argument("file", nargs="?", default=RECORDS_FILE, help="JSON lines written by the autobuilder")
+    parser.add_argument("--project", help="only this project")
+    parser.add_argument("--target", help="only this build target")
+    parser.add_argument("--status", help="only builds that ended like this, e.g. done")
+    parser.add_argument("--last", type=int, help="only the last N builds")
+    args = parser.parse_args()
+
+    try:
+        records = load_records(args.file)
+    except OSError as e:
+        print(f"Cannot read {args.file}: {e}")
+        exit(1)
+    records = [record for record in records
+               if (not args.project or record["project"] == args.project)
+               and (not args.target or record["target"] == args.target)
+               and (not args.status or record["status"] == args.status)]
+    if args.last:
+        records = records[-args.last:]
+    if not records:
+        print("No builds recorded.")
+        return
+    print_summary(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from git.exc import GitCommandError
+import RepoPoller
+import StateStore
+
+# Patch notes of a build: the commits since the last published build of the target,
+# read through GitPython (no git log of the whole history, no chdir), at most
+# max_commits of them. Targets of one project usually publish the same range, so
+# recent ranges are cached. Every build gets its own artifacts/<project>/<target>/<build>
+# folder instead of a new file in the repository root; old ones are removed.
+
+DEFAULT_MAX_COMMITS = 50
+CACHE_SIZE = 32
+KEEP_BUILDS = 20  # Artifact folders kept per target
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.path.join(SCRIPT_DIR, "artifacts")
+LAST_COMMIT_DIR = os.path.join(SCRIPT_DIR, "fingerprints")  # Files from before the state store
+
+_cache = OrderedDict()  # (repo path, since, head, max commits) -> lines
+_cache_lock = threading.Lock()
+
+
+def get_key_name(key):
+    project, target = key
+    return os.path.basename(str(project).strip("\\/")), target
+
+
+def get_last_commit_path(key):
+    name, target = get_key_name(key)
+    return os.path.join(LAST_COMMIT_DIR, f"{name}_{target}.published")
+
+
+def load_last_commit(key):
+    commit = StateStore.get_published_commit(key)
+    if commit:
+        return commit
+    try:
+        with open(get_last_commit_path(key)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def save_last_commit(key, commit):
+    # The next patch notes of the target start after this commit
+    StateStore.set_published_commit(key, commit)
+
+
+def get_lines(repo_path, since, head, max_commits):
+    cache_key = (repo_path, since, head, max_commits)
+    with _cache_lock:
+        if cache_key in _cache:
+            _cache.move_to_end(cache_key)
+            return _cache[cache_key]
+
+    repo = RepoPoller.get_repo(repo_path)
+    # One commit more than the cap tells whether anything was cut off
+    try:
+        commits = list(repo.iter_commits(f"{since}..{head}" if since else head, max_count=max_commits + 1))
+    except GitCommandError:
+        # The last published commit is gone (history rewritten, repo re-cloned)
+        commits = list(repo.iter_commits(head, max_count=max_commits + 1))
+    lines = [f"* {commit.summary}" for commit in commits[:max_commits]]
+    if len(commits) > max_commits:
+        lines.append(f"\n[Older commits omitted, showing the last {max_commits}]")
+
+    with _cache_lock:
+        _cache[cache_key] = lines
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return lines
+
+
+def get_build_dir(key, head):
+    name, target = get_key_name(key)
+    target_dir = os.path.join(ARTIFACTS_DIR, name, target)
+    build_dir = os.path.join(target_dir, f"{time.strftime('%Y_%m_%d_%H_%M_%S')}_{head[:10]}")
+    os.makedirs(build_dir, exist_ok=True)
+    # Names start with the time, so they sort oldest first
+    for old in sorted(os.listdir(target_dir))[:-KEEP_BUILDS]:
+        shutil.rmtree(os.path.join(target_dir, old), ignore_errors=True)
+    return build_dir
+
+
+def write(key, repo_path, head=None, max_commits=DEFAULT_MAX_COMMITS, log=None):
+    # head: the commit that was built (the checkout may have moved on since); returns the file
+    head = head or RepoPoller.get_repo(repo_path).head.commit.hexsha
+    since = load_last_commit(key)
+    lines = get_lines(repo_path, since, head, max_commits)
+
+    _, target = get_key_name(key)
+    path = os.path.join(get_build_dir(key, head), f'patchnote_{target}_{time.strftime("%Y_%m_%d_%H_%M_%S")}.txt')
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+    if log:
+        since_text = f"since {since[:10]}" if since else "(no earlier published build)"
+        commits = sum(line.startswith("* ") for line in lines)
+        log.info(f"Git history saved: {path} ({commits} commit(s) {since_text})")
+    return path
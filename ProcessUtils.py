@@ -0,0 +1,55 @@
+import os
+import platform
+import signal
+import subprocess
+
+try:
+    import psutil  # Optional: more precise memory numbers (includes child processes)
+except ImportError:
+    psutil = None
+
+
+def get_popen_kwargs():
+    # Own process group, so Unity and everything it spawned can be killed together
+    if platform.system() == "Windows":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_tree(proc, timeout=30):
+    if platform.system() == "Windows":
+        if proc.poll() is not None:
+            return
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        # The group can outlive its leader (e.g. the shell of shell=True), so kill it anyway
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def get_memory_bytes(pid):
+    # Resident memory of the process and its children; None if it cannot be measured
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes if p.is_running())
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
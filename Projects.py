@@ -0,0 +1,57 @@
+import glob
+import importlib
+import os
+
+# Every Configs/Config<Name>.py is one project: ENV, ENV_UNITY and CONFIGS.
+# The daemon loads all of them (or the ones named on the command line) and keeps
+# the per-project state here instead of in dicts keyed by REPO_PATH, since several
+# configs may point at the same repository.
+
+CONFIGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Configs")
+SKIPPED_BY_DEFAULT = ["Example"]
+
+
+class Project:
+    def __init__(self, name, module):
+        self.name = name
+        self.ENV = dict(module.ENV, PROJECT_NAME=name)
+        self.ENV_UNITY = module.ENV_UNITY
+        self.CONFIGS = module.CONFIGS
+        self.loggers = {}              # BUILD_TARGET -> logger, "Check" for git polling
+        self.last_commit_hash = None   # None until the repository was read successfully
+        self.forced_built = False
+
+    @property
+    def repo_path(self):
+        return self.ENV["REPO_PATH"]
+
+    def get_git_configs(self):
+        return [config for config in self.CONFIGS if not config.get("NO_GIT", False)]
+
+    def get_no_git_configs(self):
+        return [config for config in self.CONFIGS if config.get("NO_GIT", False)]
+
+    def get_logger(self, config=None):
+        # Target logger, or the project's git polling logger without a config
+        return self.loggers[config.get("BUILD_TARGET", "Unknown") if config else "Check"]
+
+
+def get_available_names():
+    names = []
+    for path in sorted(glob.glob(os.path.join(CONFIGS_DIR, "Config*.py"))):
+        names.append(os.path.splitext(os.path.basename(path))[0][len("Config"):])
+    return names
+
+
+def load_projects(names=None):
+    # names: 'Castle' or 'ConfigCastle'; all projects except the example when empty
+    available = get_available_names()
+    if names:
+        names = [name[len("Config"):] if name.startswith("Config") else name for name in names]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown project(s): {', '.join(unknown)}. Available: {', '.join(available)}")
+    else:
+        names = [name for name in available if name not in SKIPPED_BY_DEFAULT]
+
+    return [Project(name, importlib.import_module(f"Configs.Config{name}")) for name in names]
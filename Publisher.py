@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from BuildQueue import BuildCancelled, CancelToken, get_current_token, run_with_token
+
+# Sends one build to every configured destination (itch, Telegram, Dropbox) at once.
+# Each destination ("sink") has its own timeout and retries with exponential back-off,
+# and ends with its own result, so one slow or broken endpoint costs neither time nor
+# uploads of the others. A timeout kills the processes the sink started (butler);
+# HTTP uploads are bounded by their own request timeouts.
+
+DEFAULT_TIMEOUT = 1800  # Seconds per attempt
+DEFAULT_RETRIES = 2     # Attempts after the first one
+BACKOFF_BASE = 10       # Seconds before the first retry, doubled for every next one
+MAX_BACKOFF = 300
+WAIT_INTERVAL = 1
+
+
+class Sink:
+    def __init__(self, name, upload, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        self.name = name
+        self.upload = upload  # upload() -> bytes sent (or None); raises on failure
+        self.timeout = timeout
+        self.retries = retries
+        self.token = None     # CancelToken of the running attempt
+
+
+class SinkResult:
+    def __init__(self, name, ok, attempts, started, duration, error=None, sent=None):
+        self.name = name
+        self.ok = ok
+        self.attempts = attempts
+        self.started = started
+        self.duration = duration
+        self.error = error
+        self.sent = sent  # Bytes, as returned by the upload
+
+    def __str__(self):
+        status = "ok" if self.ok else f"failed: {self.error}"
+        return f"{self.name} {status} ({self.attempts} attempt(s), {self.duration:.1f}s)"
+
+
+def get_backoff(attempt):
+    return min(BACKOFF_BASE * 2 ** (attempt - 1), MAX_BACKOFF)
+
+
+def run_sink(sink, cancelled, log):
+    started = time.time()
+    error = None
+    for attempt in range(1, sink.retries + 2):
+        if cancelled.is_set():
+            break
+        token = sink.token = CancelToken()
+        timer = threading.Timer(sink.timeout, token.cancel)
+        timer.start()
+        try:
+            sent = run_with_token(token, sink.upload)
+            return SinkResult(sink.name, True, attempt, started, time.time() - started, sent=sent)
+        except BuildCancelled:
+            error = f"timed out after {sink.timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            timer.cancel()
+
+        if attempt <= sink.retries and not cancelled.is_set():
+            delay = get_backoff(attempt)
+            log.warning(f"{sink.name}: attempt {attempt} failed ({error}), retrying in {delay}s")
+            cancelled.wait(delay)
+
+    return SinkResult(sink.name, False, attempt, started, time.time() - started, error)
+
+
+def publish(sinks, log):
+    # Returns a SinkResult per sink; BuildCancelled if the build itself gets cancelled meanwhile
+    if not sinks:
+        return []
+
+    parent = get_current_token()
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(sinks), thread_name_prefix="publish") as pool:
+        futures = [pool.submit(run_sink, sink, cancelled, log) for sink in sinks]
+        while True:
+            _, not_done = wait(futures, timeout=WAIT_INTERVAL)
+            if not not_done:
+                break
+            if parent and parent.cancelled:
+                cancelled.set()
+                for sink in sinks:
+                    if sink.token:
+                        sink.token.cancel()
+
+    if parent:
+        parent.check()
+    results = [future.result() for future in futures]
+    for result in results:
+        (log.info if result.ok else log.error)(f"Publish: {result}")
+    return results
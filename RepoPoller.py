@@ -0,0 +1,105 @@
+import threading
+import time
+from git import Repo
+
+# Cheap remote change detection.
+# `git ls-remote` of a single ref is compared to the last fetched tip; only a real
+# change triggers a fetch of that one ref. The working tree is left alone until
+# fast_forward(), which the build calls once Unity is not using the folder.
+# Repos that stay idle are checked less and less often, up to max_interval.
+
+MAX_INTERVAL = 600  # Longest gap between remote checks of an idle repo, seconds
+
+_local = threading.local()  # .repos: repo_path -> Repo of this thread
+_pollers = {}  # (repo_path, branch) -> RepoPoller
+_lock = threading.Lock()
+
+
+def get_repo(repo_path):
+    # Raises InvalidGitRepositoryError / NoSuchPathError like Repo().
+    # A Repo keeps persistent `git cat-file` processes that must not be shared between threads
+    repos = getattr(_local, "repos", None)
+    if repos is None:
+        repos = _local.repos = {}
+    repo = repos.get(repo_path)
+    if repo is None:
+        repo = Repo(repo_path)
+        repos[repo_path] = repo
+    return repo
+
+
+def get_poller(repo_path, branch, min_interval=0, max_interval=MAX_INTERVAL):
+    with _lock:
+        poller = _pollers.get((repo_path, branch))
+        if poller is None:
+            poller = RepoPoller(repo_path, branch, min_interval, max_interval)
+            _pollers[(repo_path, branch)] = poller
+        return poller
+
+
+class RepoPoller:
+    def __init__(self, repo_path, branch, min_interval=0, max_interval=MAX_INTERVAL):
+        self.repo_path = repo_path
+        # 'origin/feature/x' -> remote 'origin', branch 'feature/x'; 'main' -> origin/main
+        remote, _, name = branch.partition('/')
+        if not name:
+            remote, name = "origin", remote
+        self.remote = remote
+        self.branch = name
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = min_interval
+        self.next_check = 0
+        self.lock = threading.Lock()
+
+    def get_remote_tip(self):
+        output = get_repo(self.repo_path).git.ls_remote(self.remote, f"refs/heads/{self.branch}")
+        return output.split()[0] if output else None
+
+    def get_fetched_tip(self):
+        repo = get_repo(self.repo_path)
+        try:
+            return repo.commit(f"refs/remotes/{self.remote}/{self.branch}").hexsha
+        except Exception:
+            return None
+
+    def poll(self, log, force=False):
+        # Returns the remote tip (fetched into the repo), or None if no check is due yet
+        with self.lock:
+            now = time.time()
+            if not force and now < self.next_check:
+                return None
+
+            remote_tip = self.get_remote_tip()
+            if remote_tip is None:
+                raise ValueError(f"branch {self.remote}/{self.branch} not found on remote")
+
+            if remote_tip == self.get_fetched_tip():
+                # Idle: back off
+                self.interval = min(max(self.interval * 2, self.min_interval, 1), self.max_interval)
+                self.next_check = now + self.interval
+                return remote_tip
+
+            log.info(f"'{self.repo_path}' Remote {self.remote}/{self.branch} moved to {remote_tip}, fetching...")
+            get_repo(self.repo_path).git.fetch(
+                self.remote, f"+refs/heads/{self.branch}:refs/remotes/{self.remote}/{self.branch}")
+
+            self.interval = self.min_interval
+            self.next_check = now + self.interval
+            return remote_tip
+
+    def fast_forward(self, commit, log):
+        # Moves the checkout to `commit`; never while Unity has the folder open
+        with self.lock:
+            repo = get_repo(self.repo_path)
+            if repo.head.is_detached or repo.active_branch.name != self.branch:
+                repo.git.checkout(self.branch)
+            if repo.head.commit.hexsha != commit:
+                repo.git.merge('--ff-only', commit)
+                log.info(f"'{self.repo_path}' Checkout fast-forwarded to {commit}")
+
+    def reset(self):
+        # Something (e.g. a webhook) says the remote changed: check on the next poll
+        with self.lock:
+            self.interval = self.min_interval
+            self.next_check = 0
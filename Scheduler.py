@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Runs build jobs concurrently on a bounded worker pool.
+# Every job is keyed by (project, target): one slot per key, so the same target is never
+# queued twice, while different targets run side by side.
+# Unity processes are capped separately, and builds that share a project folder are
+# serialized, because Unity locks the project directory it has open.
+# A finished build is handed to a separate post-processing pool (archive, patch notes,
+# uploads), so the Unity worker moves on to the next build while it is published.
+# Output folders are leased: the build holds its folder from Unity until the post job
+# has published it, so no build overwrites a folder that is still being archived.
+# on_stage(key, stage) is called after every stage change, outside the scheduler lock.
+
+MAX_WORKERS = 8          # Concurrent build jobs (git checks, checkouts, Unity)
+MAX_UNITY_PROCESSES = 4  # Concurrent Unity editors
+MAX_POST_WORKERS = 4     # Concurrent post-processing jobs (packaging and uploads)
+FINAL_STAGES = ("failed", "cancelled", "skipped")  # Set by the job itself, kept when it returns
+HANDED_OFF_STAGES = ("publish queued", "publish")  # The build went on to post-processing
+FOLDER_WAIT_INTERVAL = 1
+
+
+class BuildScheduler:
+    def __init__(self, max_workers=MAX_WORKERS, max_unity=MAX_UNITY_PROCESSES, max_post=MAX_POST_WORKERS, on_stage=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="build")
+        self.post_executor = ThreadPoolExecutor(max_workers=max_post, thread_name_prefix="post")
+        self.unity_slots = threading.BoundedSemaphore(max_unity)
+        self.lock = threading.Lock()
+        self.project_locks = {}  # project path -> Lock
+        self.folder_locks = {}   # output folder -> Lock, held from Unity until published
+        self.futures = {}        # (project, target) -> Future
+        self.stages = {}         # (project, target) -> (stage, timestamp)
+        self.on_stage = on_stage
+
+    def submit(self, key, fn, *args, **kwargs):
+        # Returns None if the slot for this key is still busy
+        with self.lock:
+            running = self.futures.get(key)
+            if running is not None and not running.done():
+                return None
+            self.stages[key] = ("queued", time.time())
+            future = self.executor.submit(self._run, key, fn, *args, **kwargs)
+            self.futures[key] = future
+        self._notify(key, "queued")
+        return future
+
+    def submit_post(self, key, fn, *args, **kwargs):
+        # Post-processing of a finished build. The key stays busy until it is done,
+        # so the next build of the same target waits for it
+        with self.lock:
+            self.stages[key] = ("publish queued", time.time())
+            future = self.post_executor.submit(self._run_post, key, fn, *args, **kwargs)
+            self.futures[key] = future
+        self._notify(key, "publish queued")
+        return future
+
+    def _run(self, key, fn, *args, **kwargs):
+        self.set_stage(key, "running")
+        return self._complete(key, fn, args, kwargs, FINAL_STAGES + HANDED_OFF_STAGES)
+
+    def _run_post(self, key, fn, *args, **kwargs):
+        self.set_stage(key, "publish")
+        return self._complete(key, fn, args, kwargs, FINAL_STAGES)
+
+    def _complete(self, key, fn, args, kwargs, kept_stages):
+        try:
+            result = fn(*args, **kwargs)
+            with self.lock:
+                done = self.stages[key][0] not in kept_stages
+                if done:
+                    self.stages[key] = ("done", time.time())
+            if done:
+                self._notify(key, "done")
+            return result
+        except Exception:
+            self.set_stage(key, "failed")
+            raise
+
+    def set_stage(self, key, stage):
+        with self.lock:
+            self.stages[key] = (stage, time.time())
+        self._notify(key, stage)
+
+    def _notify(self, key, stage):
+        if self.on_stage:
+            self.on_stage(key, stage)
+
+    def get_stage(self, key):
+        with self.lock:
+            return self.stages.get(key, ("idle", None))[0]
+
+    def status(self):
+        with self.lock:
+            return {key: stage for key, (stage, _) in self.stages.items()}
+
+    def project_lock(self, project_path):
+        with self.lock:
+            return self.project_locks.setdefault(project_path, threading.Lock())
+
+    def acquire_folder(self, path, key=None, check=None):
+        # Returns the folder's lease (a Lock); whoever ends up owning the folder releases
+        # it, from any thread. check() runs while waiting, e.g. to raise on cancellation
+        with self.lock:
+            lock = self.folder_locks.setdefault(os.path.normcase(os.path.abspath(path)), threading.Lock())
+        if lock.acquire(blocking=False):
+            return lock
+        if key is not None:
+            self.set_stage(key, "waiting for folder")
+        while not lock.acquire(timeout=FOLDER_WAIT_INTERVAL):
+            if check:
+                check()
+        return lock
+
+    @contextmanager
+    def unity_slot(self, project_path, key=None):
+        # Unity locks the project folder, so one editor per folder; plus a global cap
+        with self.project_lock(project_path):
+            if key is not None:
+                self.set_stage(key, "waiting for unity")
+            with self.unity_slots:
+                if key is not None:
+                    self.set_stage(key, "unity")
+                yield
+
+    def wait_all(self):
+        # Until nothing is left, since finished builds hand off post-processing jobs
+        while True:
+            with self.lock:
+                futures = [future for future in self.futures.values() if not future.done()]
+            if not futures:
+                return
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass  # Errors are logged and collected by the build job itself
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        self.post_executor.shutdown(wait=True)
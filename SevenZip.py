@@ -0,0 +1,139 @@
+import glob
+import os
+import platform
+import re
+import shutil
+import subprocess
+from BuildQueue import run_command
+
+try:
+    import py7zr  # Optional: in-process 7z when no 7-Zip executable is available
+except ImportError:
+    py7zr = None
+
+try:
+    import multivolumefile  # Optional: volumes for py7zr
+except ImportError:
+    multivolumefile = None
+
+# 7z archives of build folders, split into volumes (name.7z.001, name.7z.002, ...).
+# The bundled libc7zip.so / c7zip.dll only expose extraction (archive_open,
+# archive_extract_item, ...), so they cannot write archives. A 7-Zip executable is
+# used when one is found next to this script, in PATH or in Program Files: it has
+# multithreaded LZMA2. Without one, py7zr packs in-process.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+EXECUTABLE_NAMES = ["7zz", "7z", "7za"]
+DEFAULT_LEVEL = 9
+DEFAULT_VOLUME_SIZE = "49m"  # Telegram bots may upload up to 50 MB per file
+PROGRESS_STEP = 10  # Log every this many percent
+
+
+class SevenZipError(Exception):
+    pass
+
+
+def find_executable():
+    suffix = ".exe" if platform.system() == "Windows" else ""
+    for name in EXECUTABLE_NAMES:
+        local = os.path.join(SCRIPT_DIR, name + suffix)
+        if os.path.isfile(local) and os.access(local, os.X_OK):
+            return local
+    for name in EXECUTABLE_NAMES:
+        found = shutil.which(name)
+        if found:
+            return found
+    for folder in (os.environ.get("ProgramFiles"), os.environ.get("ProgramFiles(x86)")):
+        if folder and os.path.isfile(os.path.join(folder, "7-Zip", "7z.exe")):
+            return os.path.join(folder, "7-Zip", "7z.exe")
+    return None
+
+
+def parse_size(size):
+    # '49m' -> bytes, like 7z -v
+    match = re.fullmatch(r"(\d+)([bkmg]?)", str(size).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid volume size: {size}")
+    return int(match.group(1)) * {"": 1, "b": 1, "k": 2**10, "m": 2**20, "g": 2**30}[match.group(2)]
+
+
+def get_parts(archive_path):
+    parts = [path for path in glob.glob(glob.escape(archive_path) + ".*") if path.rsplit(".", 1)[-1].isdigit()]
+    return sorted(parts, key=lambda path: int(path.rsplit(".", 1)[-1]))
+
+
+def get_volumes(archive_path):
+    # The archive itself if it was not split, otherwise its numbered parts in order
+    if os.path.exists(archive_path):
+        return [archive_path]
+    return get_parts(archive_path)
+
+
+def remove_archive(archive_path):
+    # Including parts left by an earlier, bigger build
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+    for path in get_parts(archive_path):
+        os.remove(path)
+
+
+def make_7z(folder, archive_path, level=DEFAULT_LEVEL, threads=None, volume_size=DEFAULT_VOLUME_SIZE, log=None):
+    # Returns the written files: [archive_path] or its volumes
+    remove_archive(archive_path)
+    executable = find_executable()
+    if executable:
+        pack_with_executable(executable, folder, archive_path, level, threads, volume_size, log)
+    elif py7zr is not None:
+        pack_in_process(folder, archive_path, level, volume_size, log)
+    else:
+        raise SevenZipError("No 7-Zip found: put 7zz/7z next to autobuilder.py or in PATH, or pip install py7zr")
+
+    volumes = get_volumes(archive_path)
+    if not volumes:
+        raise SevenZipError(f"7z finished but {archive_path} was not written")
+    return volumes
+
+
+def pack_with_executable(executable, folder, archive_path, level, threads, volume_size, log):
+    cmd = [executable, "a", "-t7z", f"-mx{level}", "-bsp1", "-bso0", "-y"]
+    cmd.append(f"-mmt{threads}" if threads else "-mmt")
+    if volume_size:
+        cmd.append(f"-v{volume_size}")
+    cmd += [archive_path, folder]
+
+    output = []
+    reported = [-PROGRESS_STEP]
+
+    def on_output(text):
+        output.append(text)
+        del output[:-50]
+        # Progress comes as ' 42% 13 + file' lines separated by backspaces
+        for percent in re.findall(r"(\d+)%", text):
+            if int(percent) >= reported[0] + PROGRESS_STEP:
+                reported[0] = int(percent) - int(percent) % PROGRESS_STEP
+                if log:
+                    log.info(f"7z: {reported[0]}%")
+
+    try:
+        run_command(cmd, on_output=on_output)
+    except subprocess.CalledProcessError as e:
+        details = re.sub(r"[\b\r]+", "\n", "".join(output)).strip().splitlines()[-5:]
+        raise SevenZipError(f"7z exited with code {e.returncode}: {' | '.join(details)}")
+
+
+def pack_in_process(folder, archive_path, level, volume_size, log):
+    filters = [{"id": py7zr.FILTER_LZMA2, "preset": level}]
+    name = os.path.basename(folder.rstrip("\\/"))
+    if volume_size and multivolumefile is None and log:
+        log.warning("multivolumefile is not installed, writing a single 7z file.")
+
+    try:
+        if volume_size and multivolumefile is not None:
+            with multivolumefile.open(archive_path, mode="wb", volume=parse_size(volume_size)) as target:
+                with py7zr.SevenZipFile(target, "w", filters=filters) as archive:
+                    archive.writeall(folder, name)
+        else:
+            with py7zr.SevenZipFile(archive_path, "w", filters=filters) as archive:
+                archive.writeall(folder, name)
+    except (OSError, py7zr.exceptions.ArchiveError) as e:
+        raise SevenZipError(f"py7zr failed: {e}")
@@ -0,0 +1,217 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+# Build state that has to survive a restart, in one SQLite file:
+#   targets    per (project, target): the commit being or last built, its status and
+#              timings, the input fingerprint and the last commit that was published
+#   published  per (project, target, destination): hash of the artifact it has
+#   projects   per project: the last commit enqueued and the commit of the last forced build
+#   history    every finished build: commit, status and duration
+# The journal is WAL with synchronous=FULL: a write is on disk when the call returns,
+# and a crash leaves the last committed state behind instead of a half-written file.
+# On startup the daemon resumes from here instead of from the checkout's HEAD.
+
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints")
+DB_NAME = "state.db"
+FINISHED_STAGES = ("done", "failed", "cancelled", "skipped")
+HISTORY_KEEP = 200  # Finished builds kept per target
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (
+    project TEXT NOT NULL,
+    target TEXT NOT NULL,
+    commit_hash TEXT,
+    status TEXT,
+    started REAL,
+    finished REAL,
+    duration REAL,
+    fingerprint TEXT,
+    published_commit TEXT,
+    PRIMARY KEY (project, target)
+);
+CREATE TABLE IF NOT EXISTS published (
+    project TEXT NOT NULL,
+    target TEXT NOT NULL,
+    sink TEXT NOT NULL,
+    artifact_hash TEXT NOT NULL,
+    time TEXT NOT NULL,
+    PRIMARY KEY (project, target, sink)
+);
+CREATE TABLE IF NOT EXISTS projects (
+    project TEXT PRIMARY KEY,
+    last_commit TEXT,
+    forced_commit TEXT
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project TEXT NOT NULL,
+    target TEXT NOT NULL,
+    commit_hash TEXT,
+    status TEXT NOT NULL,
+    started REAL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS history_target ON history (project, target, id);
+"""
+
+_connection = None
+_lock = threading.Lock()  # One connection shared by the build threads
+
+
+def get_names(key):
+    project, target = key
+    return os.path.basename(str(project).strip("\\/")), target
+
+
+def get_connection():
+    # Call with _lock held; opened on first use, so STATE_DIR can still be changed before
+    global _connection
+    if _connection is None:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(STATE_DIR, DB_NAME), timeout=30, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.executescript(SCHEMA)
+        _connection = connection
+    return _connection
+
+
+def query(sql, params=()):
+    with _lock:
+        return [dict(row) for row in get_connection().execute(sql, params).fetchall()]
+
+
+def execute(sql, params=()):
+    with _lock:
+        connection = get_connection()
+        with connection:
+            connection.execute(sql, params)
+
+
+def update_target(key, **fields):
+    # Creates the row if needed
+    names = list(fields)
+    execute(f"INSERT INTO targets (project, target, {', '.join(names)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in names)}) "
+            f"ON CONFLICT (project, target) DO UPDATE SET {', '.join(f'{name} = excluded.{name}' for name in names)}",
+            get_names(key) + tuple(fields.values()))
+
+
+def get_target(key):
+    rows = query("SELECT * FROM targets WHERE project = ? AND target = ?", get_names(key))
+    return rows[0] if rows else None
+
+
+def get_targets():
+    return query("SELECT * FROM targets ORDER BY project, target")
+
+
+def start_build(key, commit):
+    update_target(key, commit_hash=commit, status="queued", started=time.time(), finished=None, duration=None)
+
+
+def set_status(key, status):
+    # Scheduler stage of a build; a final one also goes to the history. Keys that never
+    # started a build through start_build (git checks, batch jobs) have no row and are ignored
+    now = time.time()
+    project, target = get_names(key)
+    with _lock:
+        connection = get_connection()
+        with connection:
+            row = connection.execute("SELECT * FROM targets WHERE project = ? AND target = ?",
+                                     (project, target)).fetchone()
+            if row is None or row["status"] == status:
+                return
+            if status not in FINISHED_STAGES:
+                connection.execute("UPDATE targets SET status = ? WHERE project = ? AND target = ?",
+                                   (status, project, target))
+                return
+            duration = now - row["started"] if row["started"] else None
+            connection.execute("UPDATE targets SET status = ?, finished = ?, duration = ? "
+                               "WHERE project = ? AND target = ?", (status, now, duration, project, target))
+            if row["status"] in FINISHED_STAGES:
+                return  # Already in the history, e.g. "failed" set twice
+            connection.execute("INSERT INTO history (project, target, commit_hash, status, started, duration) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               (project, target, row["commit_hash"], status, row["started"], duration))
+            connection.execute("DELETE FROM history WHERE project = ? AND target = ? AND id NOT IN "
+                               "(SELECT id FROM history WHERE project = ? AND target = ? ORDER BY id DESC LIMIT ?)",
+                               (project, target, project, target, HISTORY_KEEP))
+
+
+def get_history(key, limit=20):
+    # Newest first
+    return query("SELECT * FROM history WHERE project = ? AND target = ? ORDER BY id DESC LIMIT ?",
+                 get_names(key) + (limit,))
+
+
+def get_fingerprint(key):
+    target = get_target(key)
+    return target["fingerprint"] if target else None
+
+
+def set_fingerprint(key, fingerprint):
+    update_target(key, fingerprint=fingerprint)
+
+
+def get_published_commit(key):
+    target = get_target(key)
+    return target["published_commit"] if target else None
+
+
+def set_published_commit(key, commit):
+    update_target(key, published_commit=commit)
+
+
+def get_published(key):
+    # sink -> {"hash": ..., "time": ...}
+    rows = query("SELECT sink, artifact_hash, time FROM published WHERE project = ? AND target = ?", get_names(key))
+    return {row["sink"]: {"hash": row["artifact_hash"], "time": row["time"]} for row in rows}
+
+
+def set_published(key, sink, artifact_hash):
+    execute("INSERT OR REPLACE INTO published (project, target, sink, artifact_hash, time) VALUES (?, ?, ?, ?, ?)",
+            get_names(key) + (sink, artifact_hash, time.strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def get_project(name):
+    rows = query("SELECT * FROM projects WHERE project = ?", (name,))
+    return rows[0] if rows else None
+
+
+def set_last_commit(name, commit):
+    execute("INSERT INTO projects (project, last_commit) VALUES (?, ?) "
+            "ON CONFLICT (project) DO UPDATE SET last_commit = excluded.last_commit", (name, commit))
+
+
+def set_forced_commit(name, commit):
+    execute("INSERT INTO projects (project, forced_commit) VALUES (?, ?) "
+            "ON CONFLICT (project) DO UPDATE SET forced_commit = excluded.forced_commit", (name, commit))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints the saved state of every build target.")
+    parser.add_argument("--project", help="only this project")
+    args = parser.parse_args()
+
+    rows = [("project", "target", "commit", "status", "finished", "last", "avg of 10")]
+    for target in get_targets():
+        if args.project and target["project"] != args.project:
+            continue
+        key = (target["project"], target["target"])
+        durations = [build["duration"] for build in get_history(key, 10) if build["status"] == "done" and build["duration"]]
+        finished = time.strftime("%Y-%m-%d %H:%M", time.localtime(target["finished"])) if target["finished"] else ""
+        rows.append((target["project"], target["target"], (target["commit_hash"] or "")[:10], target["status"] or "",
+                     finished, f"{target['duration']:.0f}s" if target["duration"] else "",
+                     f"{sum(durations) / len(durations):.0f}s" if durations else ""))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+if __name__ == "__main__":
+    main()
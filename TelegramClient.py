@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+import uuid
+import requests
+from requests.adapters import HTTPAdapter
+
+# Bot API client for build uploads.
+# One pooled requests.Session per bot, shared by all upload threads, so parts reuse
+# kept-alive connections. Bodies are streamed from disk (MultipartStream), so memory
+# stays flat whatever the file size. Every request has connect/read timeouts, so a
+# hung connection fails the upload instead of stalling the build loop, and 429
+# answers are retried after the retry_after the server asks for.
+# API_URL can point at a local Bot API server or at Fakes/FakeTelegramApi.py.
+
+API_URL = "https://api.telegram.org"
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 300            # Telegram answers only after the whole file is stored
+MAX_RATE_LIMIT_RETRIES = 5
+MAX_RETRY_AFTER = 600
+POOL_SIZE = 8
+READ_SIZE = 2**20
+MAX_GROUP_SIZE = 10           # sendMediaGroup takes 2-10 items
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class TelegramError(Exception):
+    pass
+
+
+class MultipartStream:
+    # multipart/form-data body read from disk piece by piece. It has a length, so
+    # requests sends it with Content-Length and streams it instead of building it in memory
+    def __init__(self, fields, files):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.pieces = []  # bytes, or a file path to stream
+        for name, value in fields.items():
+            self.pieces.append(self.get_header(name) + str(value).encode("utf-8") + b"\r\n")
+        for name, path in files.items():
+            self.pieces.append(self.get_header(name, os.path.basename(path)))
+            self.pieces.append(path)
+            self.pieces.append(b"\r\n")
+        self.pieces.append(f"--{self.boundary}--\r\n".encode("utf-8"))
+        self.length = sum(len(piece) if isinstance(piece, bytes) else os.path.getsize(piece)
+                          for piece in self.pieces)
+        self.index = 0
+        self.file = None
+
+    def get_header(self, name, filename=None):
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if filename is not None:
+            header += "Content-Type: application/octet-stream\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            data = self.read()
+            if not data:
+                return
+            yield data
+
+    def read(self, size=READ_SIZE):
+        while self.index < len(self.pieces):
+            piece = self.pieces[self.index]
+            if isinstance(piece, bytes):
+                self.index += 1
+                return piece
+            if self.file is None:
+                self.file = open(piece, "rb")
+            data = self.file.read(size if size and size > 0 else READ_SIZE)
+            if data:
+                return data
+            self.file.close()
+            self.file = None
+            self.index += 1
+        return b""
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class TelegramClient:
+    def __init__(self, token, api_url=API_URL):
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def call(self, method, fields, files=None, log=None):
+        # Result of the method; TelegramError with Telegram's description otherwise.
+        # The URL holds the bot token, so it never goes into errors or logs
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            body = MultipartStream(fields, files or {})
+            try:
+                response = self.session.post(f"{self.base_url}/{method}", data=body,
+                                             headers={"Content-Type": body.content_type},
+                                             timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            except requests.RequestException as e:
+                raise TelegramError(f"{method}: {type(e).__name__}") from None
+            finally:
+                body.close()
+
+            try:
+                result = response.json()
+            except ValueError:
+                raise TelegramError(f"{method}: HTTP {response.status_code} {response.text[:200]}")
+
+            if response.status_code == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+                retry_after = min(result.get("parameters", {}).get("retry_after", 1), MAX_RETRY_AFTER)
+                if log:
+                    log.warning(f"Telegram {method}: rate limited, retrying in {retry_after}s")
+                time.sleep(retry_after)
+                continue
+            if not response.ok or not result.get("ok"):
+                raise TelegramError(f"{method}: {result.get('error_code', response.status_code)} "
+                                    f"{result.get('description', '')}".strip())
+            return result["result"]
+
+    def send_document(self, chat_id, path, caption=None, log=None):
+        fields = {"chat_id": chat_id}
+        if caption:
+            fields["caption"] = caption
+        return self.call("sendDocument", fields, {"document": path}, log)
+
+    def send_media_group(self, chat_id, paths, caption=None, log=None):
+        # Files as one album (several albums past MAX_GROUP_SIZE); caption under the last file
+        if len(paths) == 1:
+            return [self.send_document(chat_id, paths[0], caption, log)]
+        messages = []
+        for start in range(0, len(paths), MAX_GROUP_SIZE):
+            group = paths[start:start + MAX_GROUP_SIZE]
+            if len(group) == 1:
+                messages.append(self.send_document(chat_id, group[0], caption, log))
+                continue
+            media = [{"type": "document", "media": f"attach://file{index}"} for index in range(len(group))]
+            if caption:
+                media[-1]["caption"] = caption
+            files = {f"file{index}": path for index, path in enumerate(group)}
+            messages += self.call("sendMediaGroup", {"chat_id": chat_id, "media": json.dumps(media)}, files, log)
+        return messages
+
+
+def get_client(token, api_url=API_URL):
+    # One client (and connection pool) per bot for the whole run
+    with _clients_lock:
+        key = (token, api_url)
+        if key not in _clients:
+            _clients[key] = TelegramClient(token, api_url)
+        return _clients[key]
@@ -2,6 +2,10 @@ import platform
 import os
 
 def get(env):
+    # Full command override, e.g. a stand-in editor: 'python Fakes/FakeUnityEditor.py'
+    if env.get("UNITY_COMMAND"):
+        return env["UNITY_COMMAND"]
+
     PLATFORM = platform.system()
 
     if PLATFORM == "Windows":
@@ -0,0 +1,163 @@
+import os
+import re
+import subprocess
+import threading
+import time
+import ProcessUtils
+from BuildQueue import run_command
+
+# Runs a batchmode Unity command with -logFile and follows the log while it is written.
+# Phases (import, compile, build player, IL2CPP, compression) are logged as they start,
+# with how long each took. A compile error kills the editor at once instead of after it
+# has given up on its own, and a watchdog kills the whole process tree when the log has
+# not grown for max_silence seconds (a wedged IL2CPP step) or the build runs past timeout.
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "log")
+DEFAULT_MAX_SILENCE = 1800  # Seconds without a new log line
+POLL_INTERVAL = 0.5
+MAX_ERROR_LINES = 10
+
+# In the order a player build goes through them; the phase only ever moves forward,
+# so e.g. texture "Compressing" lines during the import do not count as compression
+PHASES = [
+    ("import", re.compile(r"Start importing|Asset Pipeline Refresh|Refreshing native plugins")),
+    ("compile", re.compile(r"\[ScriptCompilation\]|Starting script compilation|Begin MonoManager ReloadAssembly")),
+    ("build player", re.compile(r"Build Start:|Building Player|BuildPlayer")),
+    ("il2cpp", re.compile(r"il2cpp", re.IGNORECASE)),
+    ("compression", re.compile(r"Compressing|Brotli", re.IGNORECASE)),
+]
+FATAL = re.compile(r"error CS\d{4}|Scripts have compiler errors|Aborting batchmode due to failure")
+ERROR = re.compile(r"error CS\d{4}|Error building Player|BuildFailedException|Build Failed:|Build Finished, Result: Failure")
+
+
+class UnityBuildError(Exception):
+    def __init__(self, message, timings=None):
+        super().__init__(message)
+        self.timings = timings or {}
+
+
+class LogFollower:
+    # Reads the log file incrementally on its own thread and decides when to kill Unity
+    def __init__(self, log_file, log, max_silence, timeout):
+        self.log_file = log_file
+        self.log = log
+        self.max_silence = max_silence
+        self.timeout = timeout
+        self.proc = None
+        self.failure = None      # Why the watchdog killed Unity
+        self.errors = []         # First error lines, for the report
+        self.phase = None
+        self.phase_started = None
+        self.timings = {}        # phase -> seconds
+        self.started = time.time()
+        self.last_output = self.started
+        self.position = 0
+        self.partial = ""
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.follow, daemon=True, name="unity-log")
+
+    def attach(self, proc):
+        self.proc = proc
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.read()  # Whatever was written after the last poll
+        if self.partial:
+            self.parse_line(self.partial)
+            self.partial = ""
+        self.set_phase(None)
+
+    def follow(self):
+        while not self.stopped.wait(POLL_INTERVAL):
+            if self.read():
+                self.last_output = time.time()
+            if self.failure:
+                self.kill()
+                return
+            now = time.time()
+            if self.max_silence and now - self.last_output > self.max_silence:
+                self.failure = f"no Unity log output for {self.max_silence}s (phase: {self.phase or 'startup'})"
+            elif self.timeout and now - self.started > self.timeout:
+                self.failure = f"Unity build took longer than {self.timeout}s (phase: {self.phase or 'startup'})"
+            if self.failure:
+                self.kill()
+                return
+
+    def kill(self):
+        self.log.error(f"Killing Unity: {self.failure}")
+        ProcessUtils.kill_process_tree(self.proc)
+
+    def read(self):
+        # True if the log grew
+        try:
+            with open(self.log_file, "rb") as f:
+                f.seek(self.position)
+                data = f.read()
+        except OSError:
+            return False  # Not created yet
+        if not data:
+            return False
+        self.position += len(data)
+        lines = (self.partial + data.decode("utf-8", "replace")).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self.parse_line(line)
+        return True
+
+    def parse_line(self, line):
+        line = line.strip()
+        if not line:
+            return
+        if ERROR.search(line) and len(self.errors) < MAX_ERROR_LINES:
+            self.errors.append(line)
+        if FATAL.search(line) and not self.failure:
+            self.failure = f"compile error: {line}"
+        current = [name for name, _ in PHASES].index(self.phase) if self.phase else -1
+        for index, (name, pattern) in enumerate(PHASES):
+            if index > current and pattern.search(line):
+                self.set_phase(name)
+                break
+
+    def set_phase(self, phase):
+        now = time.time()
+        if self.phase:
+            self.timings[self.phase] = self.timings.get(self.phase, 0) + now - self.phase_started
+            self.log.info(f"Unity: {self.phase} took {now - self.phase_started:.1f}s")
+        elif phase:
+            self.timings["startup"] = now - self.started
+        if phase:
+            self.log.info(f"Unity: {phase}...")
+        self.phase = phase
+        self.phase_started = now
+
+
+def get_log_file(name):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    return os.path.join(LOG_DIR, f"unity_{name}.log")
+
+
+def run(cmd, log_file, log, max_silence=DEFAULT_MAX_SILENCE, timeout=None):
+    # cmd: shell command without -logFile. Returns {phase: seconds, "total": seconds};
+    # UnityBuildError with the reason and the first error lines when the build fails
+    if os.path.exists(log_file):
+        os.remove(log_file)  # Unity appends; the follower must only see this run
+    follower = LogFollower(log_file, log, max_silence, timeout)
+    try:
+        run_command(f'{cmd} -logFile "{log_file}"', shell=True, on_start=follower.attach)
+        returncode = 0
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+    finally:
+        follower.stop()
+
+    timings = dict(follower.timings, total=time.time() - follower.started)
+    log.info("Unity timings: " + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in timings.items()))
+    if follower.failure or returncode != 0:
+        reason = follower.failure or f"Unity exited with code {returncode}"
+        errors = [line for line in follower.errors if line not in reason]
+        details = f" | {' | '.join(errors)}" if errors else ""
+        raise UnityBuildError(f"{reason}{details} (log: {log_file})", timings)
+    return timings
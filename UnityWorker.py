@@ -0,0 +1,216 @@
+import atexit
+import itertools
+import json
+import os
+import secrets
+import socket
+import subprocess
+import threading
+import time
+import UnityPath
+import ProcessUtils
+from BuildQueue import BuildCancelled, check_cancelled
+
+# Long-lived batchmode editor per project (ForUnity/Editor/BuildServer.cs).
+# Instead of a cold Unity start per commit, autobuilder asks the running editor to
+# refresh assets and build a target. The editor is restarted when it stops answering
+# or grows past WARM_EDITOR_MAX_MEMORY_MB; any WorkerError means "use a fresh process".
+
+START_TIMEOUT = 900       # Cold start with a full import can take a while
+REQUEST_TIMEOUT = 10
+POLL_INTERVAL = 2
+MAX_SILENCE = 120         # Seconds without an answer during a build (domain reloads drop the listener)
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "log")
+
+_workers = {}  # project path -> EditorWorker
+_workers_lock = threading.Lock()
+
+
+class WorkerError(Exception):
+    pass
+
+
+class EditorWorker:
+    def __init__(self, project_path, ENV_UNITY, log, max_memory_mb=None, build_timeout=None):
+        self.project_path = project_path
+        self.ENV_UNITY = ENV_UNITY
+        self.port = None
+        self.token = None  # Per launch; the editor echoes it in "pong", so a foreign listener is never trusted
+        self.log = log
+        self.max_memory_mb = max_memory_mb
+        self.build_timeout = build_timeout
+        self.proc = None
+        self.request_ids = itertools.count(1)
+
+    def get_command(self):
+        project_name = os.path.basename(self.project_path.strip("\\/"))
+        log_file = os.path.join(LOG_DIR, f"editor_{project_name}.log")
+        return (
+            f'{UnityPath.get(self.ENV_UNITY)} -batchmode -nographics '
+            f'-projectPath "{self.project_path}" '
+            f'-executeMethod BuildServer.Serve '
+            f'-workerPort {self.port} '
+            f'-workerToken {self.token} '
+            f'-logFile "{log_file}"'
+        )
+
+    def start(self):
+        os.makedirs(LOG_DIR, exist_ok=True)
+        self.port = get_free_port()
+        self.token = secrets.token_hex(8)
+        self.log.info(f"'{self.project_path}' Starting warm Unity editor on port {self.port}...")
+        self.proc = subprocess.Popen(self.get_command(), shell=True, **ProcessUtils.get_popen_kwargs())
+
+        deadline = time.time() + START_TIMEOUT
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise WorkerError(f"editor exited during startup with code {self.proc.returncode}")
+            if self.ping():
+                self.log.info(f"'{self.project_path}' Warm Unity editor is ready.")
+                return
+            try:
+                check_cancelled()
+            except BuildCancelled:
+                self.stop()
+                raise
+            time.sleep(POLL_INTERVAL)
+
+        self.stop()
+        raise WorkerError(f"editor did not answer within {START_TIMEOUT}s")
+
+    def stop(self):
+        if self.proc is None:
+            return
+        if self.proc.poll() is None:
+            try:
+                self.request({"command": "quit"})
+                self.proc.wait(timeout=30)
+            except (WorkerError, subprocess.TimeoutExpired):
+                pass
+        ProcessUtils.kill_process_tree(self.proc)
+        self.proc = None
+
+    def request(self, payload, timeout=REQUEST_TIMEOUT):
+        if self.port is None:
+            raise WorkerError("editor is not started")
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=timeout) as sock:
+                sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+                with sock.makefile("r", encoding="utf-8") as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise WorkerError(f"request {payload.get('command')} failed: {e}")
+
+        if not line:
+            raise WorkerError(f"empty response to {payload.get('command')}")
+        response = json.loads(line)
+        if not response.get("ok", False):
+            raise WorkerError(response.get("error") or f"request {payload.get('command')} rejected")
+        return response
+
+    def ping(self):
+        try:
+            response = self.request({"command": "ping"})
+            return response.get("status") == "pong" and response.get("token") == self.token
+        except WorkerError:
+            return False
+
+    def get_memory_mb(self):
+        if self.proc is None:
+            return None
+        memory = ProcessUtils.get_memory_bytes(self.proc.pid)
+        return memory / 2**20 if memory is not None else None
+
+    def is_healthy(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return False
+        if not self.ping():
+            self.log.warning(f"'{self.project_path}' Warm Unity editor is not responding.")
+            return False
+
+        memory_mb = self.get_memory_mb()
+        if self.max_memory_mb and memory_mb and memory_mb > self.max_memory_mb:
+            self.log.warning(f"'{self.project_path}' Warm Unity editor uses {memory_mb:.0f} MB "
+                             f"(limit {self.max_memory_mb} MB), restarting.")
+            return False
+        return True
+
+    def ensure_running(self):
+        if self.is_healthy():
+            return
+        self.stop()
+        self.start()
+
+    def build(self, target, output, log=None):
+        # True/False for build success; WorkerError if the editor itself let us down.
+        # Builds of one project are serialized, so the worker logs into the current target's log
+        if log:
+            self.log = log
+        self.ensure_running()
+
+        request_id = str(next(self.request_ids))
+        self.request({"command": "build", "id": request_id, "target": target, "output": output})
+        self.log.info(f"'{self.project_path}' Build request {request_id} sent to warm editor: {target}")
+
+        started = time.time()
+        last_answer = started
+        while True:
+            time.sleep(POLL_INTERVAL)
+            try:
+                check_cancelled()
+            except BuildCancelled:
+                # BuildPlayer cannot be interrupted from outside; the editor is restarted for the next build
+                self.log.info(f"'{self.project_path}' Build cancelled, stopping warm editor.")
+                self.stop()
+                raise
+            if self.proc.poll() is not None:
+                raise WorkerError(f"editor exited with code {self.proc.returncode} during build")
+            if self.build_timeout and time.time() - started > self.build_timeout:
+                self.stop()
+                raise WorkerError(f"build did not finish within {self.build_timeout}s")
+
+            try:
+                status = self.request({"command": "status", "id": request_id}).get("status")
+                last_answer = time.time()
+            except WorkerError:
+                # Domain reload or a long blocking step: connections are refused for a while
+                if time.time() - last_answer > MAX_SILENCE:
+                    self.stop()
+                    raise WorkerError(f"editor did not answer for {MAX_SILENCE}s during build")
+                continue
+
+            if status in ("succeeded", "failed"):
+                self.log.info(f"'{self.project_path}' Warm editor build {status} in {time.time() - started:.0f}s")
+                return status == "succeeded"
+
+
+def get_worker(env, ENV_UNITY, log):
+    project_path = env["REPO_PATH"]
+    with _workers_lock:
+        worker = _workers.get(project_path)
+        if worker is None:
+            worker = EditorWorker(project_path, ENV_UNITY, log,
+                                  env.get("WARM_EDITOR_MAX_MEMORY_MB"), env.get("WARM_EDITOR_BUILD_TIMEOUT"))
+            _workers[project_path] = worker
+        return worker
+
+
+def get_free_port():
+    # The OS picks a free loopback port; the editor binds it right after
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stop_worker(project_path):
+    with _workers_lock:
+        worker = _workers.pop(project_path, None)
+    if worker:
+        worker.stop()
+
+
+@atexit.register
+def stop_all():
+    for project_path in list(_workers):
+        stop_worker(project_path)
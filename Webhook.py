@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Optional HTTP endpoint for push events (GitHub, GitLab or Gitea style), so a push
+# starts a build right away instead of waiting for the next poll.
+# Test locally:
+#   curl -X POST localhost:8090/ -H "X-GitHub-Event: push" \
+#        -H "X-Hub-Signature-256: sha256=<hmac of body>" -d @payload.json
+
+
+def normalize_repo_url(url):
+    # 'git@github.com:Owner/Repo.git', 'https://github.com/Owner/Repo' -> 'owner/repo'
+    url = re.sub(r'\.git$', '', url.strip().rstrip('/'))
+    url = re.sub(r'^[\w+.-]+://', '', url)   # scheme
+    url = re.sub(r'^[^@/]+@', '', url)        # user
+    url = re.sub(r'^[^/:]+(:\d+)?[:/]', '', url)  # host and port
+    return url.strip('/').lower()
+
+
+def get_repo_names(payload):
+    # Every identifier of the pushed repository a config could be matched against
+    names = set()
+    repository = payload.get("repository") or {}
+    project = payload.get("project") or {}
+    for value in (repository.get("full_name"), project.get("path_with_namespace")):
+        if value:
+            names.add(value.lower())
+    for value in (repository.get("clone_url"), repository.get("ssh_url"), repository.get("html_url"),
+                  project.get("git_http_url"), project.get("git_ssh_url"), project.get("web_url")):
+        if value:
+            names.add(normalize_repo_url(value))
+    return names
+
+
+def verify(headers, body, secrets):
+    if not secrets:
+        return False  # Never build on unauthenticated requests
+
+    # GitLab sends the secret itself
+    token = headers.get("X-Gitlab-Token")
+    if token is not None:
+        return any(hmac.compare_digest(token, secret) for secret in secrets)
+
+    # GitHub: 'sha256=<hex>', Gitea: '<hex>'
+    signature = headers.get("X-Hub-Signature-256") or headers.get("X-Gitea-Signature") or ""
+    signature = signature.split("=", 1)[-1]
+    for secret in secrets:
+        expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        if hmac.compare_digest(signature, expected):
+            return True
+    return False
+
+
+def is_push_event(headers):
+    event = headers.get("X-GitHub-Event") or headers.get("X-Gitea-Event") or headers.get("X-Gitlab-Event") or ""
+    return event.lower() in ("push", "push hook")
+
+
+class WebhookServer:
+    def __init__(self, port, secrets, on_push, log):
+        # on_push(repo_names, branch) -> number of builds enqueued
+        self.port = port
+        self.secrets = [secret for secret in secrets if secret]
+        self.on_push = on_push
+        self.log = log
+        self.server = None
+
+    def start(self):
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                status, message = webhook.handle(self.headers, body)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.end_headers()
+                self.wfile.write(message.encode("utf-8"))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="webhook").start()
+        self.log.info(f"Webhook listening on port {self.port}")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+
+    def handle(self, headers, body):
+        if not verify(headers, body, self.secrets):
+            self.log.warning("Webhook: rejected request with invalid secret")
+            return 403, "invalid secret"
+        if not is_push_event(headers):
+            return 200, "ignored event"
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return 400, "invalid json"
+
+        ref = payload.get("ref", "")
+        if not ref.startswith("refs/heads/"):
+            return 200, "ignored ref"
+        branch = ref[len("refs/heads/"):]
+        names = get_repo_names(payload)
+
+        enqueued = self.on_push(names, branch)
+        self.log.info(f"Webhook: push to {sorted(names)} {branch}, {enqueued} build check(s) enqueued")
+        return 202 if enqueued else 200, f"enqueued {enqueued}"
@@ -0,0 +1,70 @@
+import os
+import threading
+from git import Repo
+
+# Keeps one checkout of a project per build target, so several targets of the same
+# project can be built at once (Unity locks the project folder it has open).
+# Checkouts are reused between builds, so each keeps its own warm Library folder.
+# "worktree" mode uses `git worktree` (shared object storage), "clone" makes local clones.
+
+_pools = {}  # repo_path -> WorktreePool
+_pools_lock = threading.Lock()
+
+
+class WorktreePool:
+    def __init__(self, repo_path, root=None, mode="worktree"):
+        self.repo_path = repo_path
+        self.root = root or f"{repo_path.rstrip(chr(92) + '/')}_worktrees"
+        self.mode = mode
+        self.lock = threading.Lock()  # git worktree add / fetch touch the main repo
+        self.repos = {}  # target -> Repo
+
+    def get_path(self, target):
+        return os.path.join(self.root, target)
+
+    def acquire(self, target, commit, log):
+        # Returns the checkout of `target`, synced to `commit`
+        path = self.get_path(target)
+        repo = self.repos.get(target)
+        if repo is None:
+            repo = self._open_or_create(path, commit, log)
+            self.repos[target] = repo
+
+        if self.mode == "clone":
+            # The commit may only be fetched into the main repo, not merged into a branch yet
+            with self.lock:
+                repo.git.fetch('origin', commit)
+
+        if repo.head.is_valid() and repo.head.commit.hexsha == commit:
+            log.info(f"'{path}' Checkout already at {commit}")
+            return path
+
+        # Keep ignored files (Library, Temp, build folders), drop everything else
+        repo.git.checkout('--force', '--detach', commit)
+        repo.git.clean('-fd')
+        log.info(f"'{path}' Checkout synced to {commit}")
+        return path
+
+    def _open_or_create(self, path, commit, log):
+        if os.path.isdir(os.path.join(path, ".git")) or os.path.isfile(os.path.join(path, ".git")):
+            return Repo(path)
+
+        os.makedirs(self.root, exist_ok=True)
+        log.info(f"'{self.repo_path}' Creating {self.mode} for build at {path}")
+        with self.lock:
+            if self.mode == "clone":
+                return Repo.clone_from(self.repo_path, path, local=True)
+            main = Repo(self.repo_path)
+            main.git.worktree('prune')
+            main.git.worktree('add', '--detach', path, commit)
+        return Repo(path)
+
+
+def get_pool(env):
+    repo_path = env["REPO_PATH"]
+    with _pools_lock:
+        pool = _pools.get(repo_path)
+        if pool is None:
+            pool = WorktreePool(repo_path, env.get("WORKTREE_ROOT"), env.get("WORKTREE_MODE", "worktree"))
+            _pools[repo_path] = pool
+        return pool
@@ -2,27 +2,101 @@
 # you'll need an itch.io butler for this
 # https://itch.io/docs/butler/login.html
   
+import argparse
 import os
 import subprocess
 import time
 import logging
 from logging import handlers
 import colorlog
-import requests
-from git import Repo
 from git.exc import InvalidGitRepositoryError
-from io import StringIO
-import shutil
-from Configs import ConfigPayOrDie as Config
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import UnityPath
 import ButlerPath
-
-log_buffers = {}  # repo_path -> StringIO
+import Butler
+import Scheduler
+from Scheduler import BuildScheduler
+import WorktreePool
+from LibraryCache import LibraryCache
+import UnityWorker
+import UnityRunner
+import RepoPoller
+import Webhook
+import Projects
+import Fingerprint
+import Archiver
+import Publisher
+import TelegramClient
+import DropboxSync
+import ArtifactStore
+import PatchNotes
+import Metrics
+import StateStore
+import BuildLog
+import SevenZip
+from BuildQueue import BuildQueue, BuildCancelled, run_command, run_with_token, get_current_token
 
 CHECK_INTERVAL = 60  # Time in seconds to wait before checking for new commits
+POLL_MAX_INTERVAL = 600  # Idle repos are checked less often, down to once per this many seconds
+WEBHOOK_PORT = None  # e.g. 8090 to accept push events (needs ENV["WEBHOOK_SECRET"])
+WEBHOOK_POLL_INTERVAL = 900  # With the webhook on, polling is only a safety net
+BUILD_QUIET_PERIOD = 30  # Wait this long after the last new commit, so a burst of pushes is built once
+CANCEL_SUPERSEDED_BUILDS = True  # Kill a running build when a newer commit of the same target arrives
+PART_UPLOAD_WORKERS = 4  # Volumes of one archive uploaded at once, per destination
+MAX_ERRORS = 1000  # Errors kept for the summary; the daemon runs for weeks
+CAPTION_LIMIT = 1024  # Telegram caption length
+
+RESUMED_STATUSES = ("done", "skipped", "failed")  # Builds a restart does not run again
+
+
+def on_stage(key, stage):
+    # Every stage change of a build: closes its metrics record and log capture, saves its status
+    Metrics.on_stage(key, stage)
+    BuildLog.on_stage(key, stage)
+    StateStore.set_status(key, stage)
+
+
+scheduler = BuildScheduler(on_stage=on_stage)
+build_queue = BuildQueue(scheduler, BUILD_QUIET_PERIOD, CANCEL_SUPERSEDED_BUILDS)
+
+
+def init_scheduler(max_workers=Scheduler.MAX_WORKERS, max_unity=Scheduler.MAX_UNITY_PROCESSES,
+                   max_post=Scheduler.MAX_POST_WORKERS):
+    # One scheduler for all projects, so they share the machine instead of oversubscribing it
+    global scheduler, build_queue
+    scheduler = BuildScheduler(max_workers, max_unity, max_post, on_stage)
+    build_queue = BuildQueue(scheduler, BUILD_QUIET_PERIOD, CANCEL_SUPERSEDED_BUILDS)
+
+
+def get_job_key(config, env):
+    return env.get("PROJECT_NAME", env.get("SOURCE_REPO_PATH", env["REPO_PATH"])), config.get("BUILD_TARGET", "Unknown")
+
 
+def get_build_env(checkout_name, env, commit_hash, log, keys=()):
+    # With USE_WORKTREES every target builds from its own checkout of REPO_PATH
+    if not env.get("USE_WORKTREES", False):
+        return env
 
-def zip_build_folder(build_folder, log, method="zip"):
+    pool = WorktreePool.get_pool(env)
+    with Metrics.stage(keys, "pull"):
+        path = pool.acquire(checkout_name, commit_hash, log)
+    return dict(env, REPO_PATH=path, SOURCE_REPO_PATH=env["REPO_PATH"])
+
+
+def get_library_cache(env):
+    # A worktree already keeps its own Library per target; a warm editor holds its Library open
+    if not env.get("LIBRARY_CACHE", False) or "SOURCE_REPO_PATH" in env or env.get("WARM_EDITOR", False):
+        return None
+
+    max_gb = env.get("LIBRARY_CACHE_MAX_GB")
+    max_bytes = int(max_gb * 2**30) if max_gb else None
+    return LibraryCache(env["REPO_PATH"], env.get("LIBRARY_CACHE_PATH"), max_bytes)
+
+
+def zip_build_folder(build_folder, log, method="zip", level=None, threads=None, volume_size=SevenZip.DEFAULT_VOLUME_SIZE):
     zip_path = f"{build_folder}.{'7z' if method == '7z' else 'zip'}"
     log.info(f"Creating {method} archive: {zip_path}")
 
@@ -30,56 +104,50 @@ def zip_build_folder(build_folder, log, method="zip"):
     if os.path.exists(zip_path):
         os.remove(zip_path)
 
-    # Архивируем (make_archive возвращает путь к архиву)
+    # Архивируем параллельно; уже сжатые файлы (.br, .unityweb, .apk...) кладутся как есть
     if method == "zip":
-        shutil.make_archive(build_folder, 'zip', build_folder)
+        parts = [Archiver.make_zip(build_folder, zip_path, level or Archiver.DEFAULT_LEVEL, threads, log)]
     else:
-        # Используем 7z (требуется установленный 7z)
-        seven = shutil.which('7z') or shutil.which('7za') or r'C:\Program Files\7-Zip\7z.exe'
-        if not seven or not os.path.exists(seven):
-            raise FileNotFoundError("7z executable not found. Install 7-Zip or put 7z in PATH.")
-        cmd = [seven, 'a', zip_path, build_folder, '-mx9', '-v49m']
-        subprocess.run(cmd, check=True)
+        # 7-Zip рядом со скриптом или в PATH, иначе py7zr в процессе; 7z режет архив на тома
+        parts = SevenZip.make_7z(build_folder, zip_path, level or SevenZip.DEFAULT_LEVEL, threads, volume_size, log)
 
-    log.info(f"{method.upper()} archive created: {zip_path}")
-    return zip_path
+    log.info(f"{method.upper()} archive created: {zip_path} ({len(parts)} part(s))")
+    return Archiver.write_manifest(zip_path, parts)
 
 
-def upload_to_telegram(file_path, token, chat_id, log):
-    url = f'https://api.telegram.org/bot{token}/sendDocument'
-    with open(file_path, 'rb') as file:
-        files = {'document': file}
-        params = {'chat_id': chat_id}
-        response = requests.post(url, params=params, files=files)
-        log.info(f"Uploaded to Telegram: {file_path} | Response: {response.json()}")
+def get_telegram_client(env):
+    return TelegramClient.get_client(env.get("TELEGRAM_BOT_TOKEN", ""),
+                                     env.get("TELEGRAM_API_URL", TelegramClient.API_URL))
 
 
-def copy_to_dropbox(file_path, dropbox_path, log):
-    if not os.path.exists(dropbox_path):
-        os.makedirs(dropbox_path)
-    shutil.copy(file_path, dropbox_path)
-    log.info(f"Copied to Dropbox: {file_path}")
+def upload_to_telegram(file_path, client, chat_id, log, caption=None):
+    # Returns the bytes sent, like the other uploads
+    message = client.send_document(chat_id, file_path, caption, log)
+    log.info(f"Uploaded to Telegram: {file_path} | Message: {message.get('message_id')}")
+    return os.path.getsize(file_path)
 
 
-def extract_git_history(repo_path, hash, log):
-    os.chdir(repo_path)
-    full_log = subprocess.getoutput('git log --oneline HEAD').split('\n')
-    extracted = []
-    for x in full_log:
-        extracted.append("* " + x[9:])
-        if hash in x:
-            extracted.append("\n[Old history]\n")
-    log_file = os.path.join(repo_path, f'patchnote_{time.strftime("%Y_%m_%d_%H_%M_%S")}.txt')
-    with open(log_file, 'w') as f:
-        f.write("\n".join(extracted))
-    log.info(f"Git history saved: {log_file}")
-    return log_file
+def upload_group_to_telegram(paths, client, chat_id, log):
+    messages = client.send_media_group(chat_id, paths, log=log)
+    log.info(f"Uploaded to Telegram: {', '.join(paths)} | Messages: "
+             f"{', '.join(str(message.get('message_id')) for message in messages)}")
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def copy_to_dropbox(file_path, dropbox_path, log):
+    # Targets published in parallel may create the folder at the same time
+    os.makedirs(dropbox_path, exist_ok=True)
+    DropboxSync.copy_file(file_path, os.path.join(dropbox_path, os.path.basename(file_path)))
+    log.info(f"Copied to Dropbox: {file_path}")
+    return os.path.getsize(file_path)
 
 
 # Setup per-project loggers
-def setup_logger(repo_path, build_target):
-    project_name = os.path.basename(repo_path.strip("\\/"))
+def setup_logger(project_name, build_target):
     logger = logging.getLogger(f"{project_name}_{build_target}")
+    # Avoid duplicate handlers and filters
+    if logger.handlers:
+        return logger
     logger.setLevel(logging.INFO)
 
     # Добавляем фильтр, который вставляет платформу в каждое сообщение
@@ -111,35 +179,40 @@ def setup_logger(repo_path, build_target):
     ch = logging.StreamHandler()
     ch.setFormatter(color_formatter)
 
-    # Avoid duplicate handlers
-    buffer = StringIO()
-    bh = logging.StreamHandler(buffer)
-    bh.setFormatter(formatter)
-    log_buffers[repo_path] = buffer
+    # Log of the running build, for failure notifications; bounded in memory
+    bh = BuildLog.get_handler((project_name, build_target), formatter)
 
-    if not logger.handlers:
-        logger.addHandler(fh)
-        logger.addHandler(ch)
-        logger.addHandler(bh)
+    logger.addHandler(fh)
+    logger.addHandler(ch)
+    logger.addHandler(bh)
 
     return logger
 
 def get_latest_commit_hash(repo_path, log):
     try:
-        repo = Repo(repo_path)
+        repo = RepoPoller.get_repo(repo_path)
         return repo.head.commit.hexsha
     except InvalidGitRepositoryError:
         log.error(f"'{repo_path}' is not a valid Git repository. Skipping.")
         return None
 
-def pull_latest_changes(repo_path, branch, log):
+def fetch_latest_changes(repo_path, branch, log):
+    # ls-remote first; fetches only when the remote branch moved, the checkout is not touched.
+    # Returns the remote tip, or None if no check is due yet or it failed
     try:
-        repo = Repo(repo_path)
-        repo.git.checkout(branch.split('/')[-1])
-        origin = repo.remotes.origin
-        origin.pull()
+        poller = RepoPoller.get_poller(repo_path, branch, CHECK_INTERVAL, POLL_MAX_INTERVAL)
+        return poller.poll(log)
     except Exception as e:
-        log.warning(f"'{repo_path}' Failed to pull latest changes: {e}")
+        log.warning(f"'{repo_path}' Failed to fetch latest changes: {e}")
+        return None
+
+def sync_checkout(env, log, keys=()):
+    # Fast-forward the main checkout to the commit being built; call with the Unity lock held
+    commit = env.get("BUILD_COMMIT")
+    if not commit or "SOURCE_REPO_PATH" in env:
+        return
+    with Metrics.stage(keys, "pull"):
+        RepoPoller.get_poller(env["REPO_PATH"], env["BRANCH"], CHECK_INTERVAL, POLL_MAX_INTERVAL).fast_forward(commit, log)
 
 def get_build_path_to_push(config, env, log):
     build_path_to_push = os.path.join(str(env["REPO_PATH"]), str(config["BUILD_PATH"]))
@@ -155,50 +228,114 @@ def get_build_path_to_push(config, env, log):
 
     return build_path_to_push
 
-def upload_itch(config, env,log, build_path_to_push):
-    if not env.get("UPLOAD_TO_ITCH", False):
-        log.info("UPLOAD flag is False, skipping itch upload.")
-        return
+def upload_parts(manifest, upload, destination, log, done=None):
+    # upload(path, caption) -> bytes sent, for every volume at once; raises once all of them
+    # were tried. Paths in `done` were sent by an earlier attempt and are skipped; new
+    # successes are added. Returns the bytes sent
+    done = set() if done is None else done
+    parts = manifest["parts"]
+    total = len(parts)
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=min(PART_UPLOAD_WORKERS, total)) as pool:
+        futures = [(pool.submit(upload, path, f"{os.path.basename(path)} ({index}/{total})"), path)
+                   for index, path in enumerate(parts, 1) if path not in done]
+    failed = []
+    sent = 0
+    for future, path in futures:
+        try:
+            sent += future.result() or 0
+            done.add(path)
+        except Exception as e:
+            failed.append(f"{os.path.basename(path)}: {e}")
 
-    log.info(f"'{env['REPO_PATH']}' Uploading build to Itch.io...")
-    subprocess.run([
-        ButlerPath.get(),
-        'push',
-        build_path_to_push,
-        f"{env['ITCH_PROJECT']}:{config['ITCH_TARGET']}"
-    ], check=True)
-    log.info(f"'{env['REPO_PATH']}' Build uploaded to Itch.io successfully.")
+    log.info(f"{destination}: {total - len(failed)}/{total} part(s) of {os.path.basename(manifest['archive'])} "
+             f"uploaded in {time.time() - started:.1f}s")
+    if failed:
+        raise RuntimeError(f"{destination} upload failed for {len(failed)}/{total} part(s): {'; '.join(failed)}")
+    return sent
 
-def upload_tg(config,env,log, build_path_to_push, history_file):
-    if config.get("UPLOAD_TELEGRAM", False):
-        upload_to_telegram(build_path_to_push, env.get("TELEGRAM_BOT_TOKEN", ""), env.get("TELEGRAM_CHAT_ID", ""), log)
-        if history_file:
-            upload_to_telegram(history_file, env.get("TELEGRAM_BOT_TOKEN", ""), env.get("TELEGRAM_CHAT_ID", ""), log)
 
-def upload_dropbox(config,env, log, build_path_to_push, history_file):
+def upload_itch(config, env,log, build_path):
+    # Always the raw build folder (or APK), never the archive: butler uploads only the
+    # diff against the channel's last build, and a fresh zip would change every byte
+    log.info(f"'{env['REPO_PATH']}' Uploading build to Itch.io...")
+    stats = Butler.push(build_path, f"{env['ITCH_PROJECT']}:{config['ITCH_TARGET']}",
+                        config.get("BUTLER_IF_CHANGED", False), log)
+    log.info(f"'{env['REPO_PATH']}' Build uploaded to Itch.io successfully.")
+    return stats.get("patch_bytes")
+
+def upload_tg(config,env,log, manifest, history_file, sent=None):
+    # sent: files already posted by an earlier attempt, so a retry does not post them twice.
+    # Returns the bytes sent by this attempt
+    sent = set() if sent is None else sent
+    if not config.get("UPLOAD_TELEGRAM", False):
+        return 0
+    client, chat_id = get_telegram_client(env), env.get("TELEGRAM_CHAT_ID", "")
+    # Build and patch note go as one album; a split build goes part by part in parallel,
+    # then its manifest and patch note as the album
+    bytes_sent = 0
+    if len(manifest["parts"]) == 1:
+        group = [manifest["parts"][0], history_file]
+    else:
+        bytes_sent += upload_parts(manifest, lambda path, caption: upload_to_telegram(path, client, chat_id, log, caption),
+                                   "Telegram", log, sent)
+        group = [manifest["manifest_path"], history_file]
+    group = [path for path in group if path and path not in sent]
+    if group:
+        bytes_sent += upload_group_to_telegram(group, client, chat_id, log)
+        sent.update(group)
+    return bytes_sent
+
+def is_dropbox_sync(config, build_path):
+    return config.get("DROPBOX_SYNC", False) and os.path.isdir(build_path)
+
+def upload_dropbox(config,env, log, manifest, history_file, build_path):
+    # Returns the bytes written to the Dropbox folder
+    bytes_sent = 0
     if config.get("UPLOAD_DROPBOX", False):
-        copy_to_dropbox(build_path_to_push, env.get("DROPBOX_PATH", ""), log)
+        dropbox_path = env.get("DROPBOX_PATH", "")
+        if is_dropbox_sync(config, build_path):
+            # Зеркало папки билда: копируются только изменившиеся файлы
+            _, _, _, bytes_sent = DropboxSync.sync_folder(build_path, os.path.join(dropbox_path, os.path.basename(build_path)), log)
+        else:
+            bytes_sent += upload_parts(manifest, lambda path, caption: copy_to_dropbox(path, dropbox_path, log), "Dropbox", log)
+            if len(manifest["parts"]) > 1:
+                bytes_sent += copy_to_dropbox(manifest["manifest_path"], dropbox_path, log)
         if history_file:
-            copy_to_dropbox(history_file, env.get("DROPBOX_PATH", ""), log)
+            bytes_sent += copy_to_dropbox(history_file, env.get("DROPBOX_PATH", ""), log)
+    return bytes_sent
 
-def try_zip(config,env, log):
-    build_path_to_push = get_build_path_to_push(config, env, log)
+def try_zip(config,env, log, build_path_to_push):
+    # Manifest of what to upload: the archive volumes in order, or the build itself
     if config.get("ZIP_BEFORE_UPLOAD", False):
-        try:
-            method = config.get("ZIP_METHOD", "zip")
-            build_path_to_push = zip_build_folder(build_path_to_push, log, method)
-        except Exception as e:
-            log.error(f"Failed to create archive: {e}")
-            return None
-
-    return build_path_to_push
+        method = config.get("ZIP_METHOD", "zip")
+        with Metrics.stage([get_job_key(config, env)], "archive", method=method) as stage:
+            try:
+                manifest = zip_build_folder(build_path_to_push, log, method, config.get("ZIP_LEVEL"),
+                                            config.get("ZIP_THREADS"),
+                                            config.get("ZIP_VOLUME_SIZE", SevenZip.DEFAULT_VOLUME_SIZE))
+            except Exception as e:
+                log.error(f"Failed to create archive: {e}")
+                stage.update(ok=False, error=str(e))
+                return None
+            stage.update(bytes=sum(os.path.getsize(path) for path in manifest["parts"]), parts=len(manifest["parts"]))
+            return manifest
+
+    return Archiver.get_single_manifest(build_path_to_push)
 
 def get_history_file(config,env, log):
     if config.get("NO_GIT", False):
         return None
 
-    hash = get_latest_commit_hash(env["REPO_PATH"], log)
-    return extract_git_history(env["REPO_PATH"], hash, log)
+    # Commits since the target's last published build, up to the commit that was built
+    key = get_job_key(config, env)
+    with Metrics.stage([key], "patch notes"):
+        return PatchNotes.write(key, env["REPO_PATH"], env.get("BUILD_COMMIT"),
+                                env.get("PATCH_NOTES_MAX_COMMITS", PatchNotes.DEFAULT_MAX_COMMITS), log)
+
+def get_output_path(config, env):
+    return os.path.join(str(env["REPO_PATH"]), str(config["BUILD_PATH"]))
+
 
 def get_unity_build_command(config, env, ENV_UNITY):
     # Build the single command string as you would run it in the terminal
@@ -210,39 +347,397 @@ def get_unity_build_command(config, env, ENV_UNITY):
         f'-projectPath "{env["REPO_PATH"]}" '
         f'-executeMethod Builder.Build '
         f'-buildTarget {config["BUILD_TARGET"]} '
-        f'-output "{f"{os.path.join(str(env["REPO_PATH"]), str(config["BUILD_PATH"]))}"}"'
+        f'-output "{get_output_path(config, env)}"'
     )
 
 
-# Глобальный список для сбора всех ошибок
-ALL_ERRORS = []
+# Глобальный список для сбора всех ошибок (последние MAX_ERRORS)
+ALL_ERRORS = deque(maxlen=MAX_ERRORS)
 
-def build_unity_project(config, env, ENV_UNITY, log):
+def get_unity_batch_build_command(configs, env, ENV_UNITY, result_file):
+    # One editor launch for several targets of the same project (Builder.BuildMany)
+    unity_path = UnityPath.get(ENV_UNITY)
+    targets = ",".join(config["BUILD_TARGET"] for config in configs)
+    outputs = ";".join(get_output_path(config, env) for config in configs)
+    return (
+        f'{unity_path} -batchmode -nographics -quit '
+        f'-projectPath "{env["REPO_PATH"]}" '
+        f'-executeMethod Builder.BuildMany '
+        f'-buildTarget {configs[0]["BUILD_TARGET"]} '
+        f'-buildTargets {targets} '
+        f'-outputs "{outputs}" '
+        f'-resultFile "{result_file}"'
+    )
+
+
+def build_with_warm_editor(config, env, ENV_UNITY, log):
+    # False means the warm editor is unusable and a fresh Unity process should be used
     try:
-        log.info(f"'{env['REPO_PATH']}' Starting Unity build...")
-        cmd = get_unity_build_command(config, env, ENV_UNITY)
-        subprocess.run(cmd, shell=True, check=True)
-        log.info(f"'{env['REPO_PATH']}' Unity build completed successfully.")
-
-        history_file = get_history_file(config, env, log)
-        build_path_to_push = try_zip(config, env, log)
-        if not build_path_to_push:
-            log.warning(f"'{env['REPO_PATH']}' Nothing to upload after build.")
-            return
+        worker = UnityWorker.get_worker(env, ENV_UNITY, log)
+        if not worker.build(config["BUILD_TARGET"], get_output_path(config, env), log):
+            raise subprocess.CalledProcessError(1, f"BuildServer build {config['BUILD_TARGET']}")
+        return True
+    except UnityWorker.WorkerError as e:
+        log.warning(f"'{env['REPO_PATH']}' Warm editor failed ({e}), falling back to a fresh Unity process.")
+        # The editor must release the project folder before another Unity can open it
+        UnityWorker.stop_worker(env["REPO_PATH"])
+        return False
+
+
+def get_unity_log_name(env, target):
+    project = env.get("PROJECT_NAME") or os.path.basename(env.get("SOURCE_REPO_PATH", env["REPO_PATH"]).strip("\\/"))
+    return f"{project}_{target}"
+
+
+def run_unity(cmd, env, log_name, log, keys=()):
+    # Unity with its log followed: phases, timings, fast failure, no-progress watchdog
+    with Metrics.stage(keys, "unity") as stage:
+        try:
+            stage["phases"] = UnityRunner.run(cmd, UnityRunner.get_log_file(log_name), log,
+                                              env.get("UNITY_MAX_SILENCE", UnityRunner.DEFAULT_MAX_SILENCE),
+                                              env.get("UNITY_BUILD_TIMEOUT"))
+        except UnityRunner.UnityBuildError as e:
+            stage["phases"] = e.timings
+            raise
+        return stage["phases"]
+
+
+def run_unity_build(config, env, ENV_UNITY, log):
+    key = get_job_key(config, env)
+    cmd = get_unity_build_command(config, env, ENV_UNITY)
+    library_cache = get_library_cache(env)
+    with scheduler.unity_slot(env["REPO_PATH"], key):
+        sync_checkout(env, log, [key])
+        if env.get("WARM_EDITOR", False):
+            with Metrics.stage([key], "unity", warm_editor=True) as stage:
+                if not build_with_warm_editor(config, env, ENV_UNITY, log):
+                    stage.update(stage="warm editor", ok=False)  # Falls back to a fresh Unity below
+            if stage["ok"]:
+                return
+        if library_cache:
+            library_cache.swap_in(config["BUILD_TARGET"], log)
+        try:
+            log.info(f"'{env['REPO_PATH']}' Starting Unity build...")
+            run_unity(cmd, env, get_unity_log_name(env, config["BUILD_TARGET"]), log, [key])
+            log.info(f"'{env['REPO_PATH']}' Unity build completed successfully.")
+        finally:
+            if library_cache:
+                library_cache.save_back(config["BUILD_TARGET"], log)
+
+
+def get_sink_names(config, env, log):
+    names = []
+    if env.get("UPLOAD_TO_ITCH", False):
+        names.append("itch")
+    else:
+        log.info("UPLOAD flag is False, skipping itch upload.")
+    if config.get("UPLOAD_TELEGRAM", False):
+        names.append("Telegram")
+    if config.get("UPLOAD_DROPBOX", False):
+        names.append("Dropbox")
+    return names
+
+
+def needs_archive(config, names, build_path):
+    # itch gets the raw build, so does Dropbox when it mirrors the folder
+    return "Telegram" in names or ("Dropbox" in names and not is_dropbox_sync(config, build_path))
+
+
+def get_sinks(config, env, log, get_manifest, history_file, build_path, names):
+    # get_manifest() waits for the archive, so only the sinks that upload it wait
+    timeout = config.get("UPLOAD_TIMEOUT", Publisher.DEFAULT_TIMEOUT)
+    retries = config.get("UPLOAD_RETRIES", Publisher.DEFAULT_RETRIES)
+    sent = set()
+    uploads = {
+        "itch": lambda: upload_itch(config, env, log, build_path),
+        "Telegram": lambda: upload_tg(config, env, log, get_manifest(), history_file, sent),
+        "Dropbox": lambda: upload_dropbox(config, env, log, get_manifest(), history_file, build_path),
+    }
+    return [Publisher.Sink(name, uploads[name], timeout, retries) for name in names]
+
+
+def get_artifact_hash(env, log, build_path):
+    # None when dedup is off or there is nothing to hash
+    if not env.get("SKIP_UNCHANGED_UPLOADS", True) or not os.path.exists(build_path):
+        return None
+    try:
+        return ArtifactStore.get_hash(build_path)
+    except OSError as e:
+        log.warning(f"Could not hash the build, publishing without dedup: {e}")
+        return None
+
+
+def skip_published_sinks(key, names, artifact_hash, log):
+    # Destinations that already have this exact build are left out
+    if not artifact_hash:
+        return names
+    unchanged = [name for name in names if ArtifactStore.is_published(key, name, artifact_hash)]
+    if unchanged:
+        log.info(f"Build is identical to the last one published to {', '.join(unchanged)} "
+                 f"({artifact_hash[:12]}), not uploading it there again.")
+    for name in unchanged:
+        Metrics.add([key], f"upload {name}", time.time(), cache_hit=True, bytes=0)
+    return [name for name in names if name not in unchanged]
+
+
+def get_artifact_size(build_path):
+    if os.path.isfile(build_path):
+        return os.path.getsize(build_path)
+    return sum(DropboxSync.list_files(build_path).values())
+
+
+def publish_build(config, env, log):
+    # False if any destination failed (already reported in ALL_ERRORS)
+    key = get_job_key(config, env)
+    scheduler.set_stage(key, "publish")
+
+    build_path = get_build_path_to_push(config, env, log)
+    if not build_path:
+        log.warning(f"'{env['REPO_PATH']}' Nothing to upload after build.")
+        return True
+
+    Metrics.set_fields([key], artifact_bytes=get_artifact_size(build_path))
+    # Hashed before zipping, so a build every destination already has is not even archived
+    artifact_hash = get_artifact_hash(env, log, build_path)
+    names = skip_published_sinks(key, get_sink_names(config, env, log), artifact_hash, log)
+    if not names:
+        log.info(f"'{env['REPO_PATH']}' Nothing new to publish.")
+        return True
+
+    history_file = get_history_file(config, env, log)
+
+    # Архив собирается, пока butler уже отправляет сырую папку
+    archiving = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+    manifest_future = None
+    if needs_archive(config, names, build_path):
+        manifest_future = archiving.submit(run_with_token, get_current_token(), try_zip, config, env, log, build_path)
+
+    def get_manifest():
+        if manifest_future is None:
+            return None
+        manifest = manifest_future.result()
+        if not manifest:
+            raise RuntimeError("the archive could not be created")
+        return manifest
+
+    # Все направления параллельно; у каждого свой таймаут, повторы и результат
+    try:
+        results = Publisher.publish(get_sinks(config, env, log, get_manifest, history_file, build_path, names), log)
+    finally:
+        archiving.shutdown()
+    for result in results:
+        Metrics.add([key], f"upload {result.name}", result.started, result.started + result.duration,
+                    ok=result.ok, attempts=result.attempts, bytes=result.sent)
+        if artifact_hash and result.ok:
+            ArtifactStore.save(key, result.name, artifact_hash)
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        ALL_ERRORS.append(f"'{env['REPO_PATH']}' {config['BUILD_TARGET']} upload: {result}")
+    if failed:
+        scheduler.set_stage(key, "failed")
+        notify_failure(env, key, f"'{env['REPO_PATH']}' {config['BUILD_TARGET']} upload failed: "
+                                 f"{'; '.join(str(result) for result in failed)}", log)
+        return False
+
+    if env.get("BUILD_COMMIT"):
+        PatchNotes.save_last_commit(key, env["BUILD_COMMIT"])
+    log.info(f"'{env['REPO_PATH']}' Build done.")
+    return True
+
+
+def notify_failure(env, key, msg, log):
+    # The error to the Telegram chat, with the full log of the build attached
+    if not env.get("NOTIFY_FAILURES", False) or not env.get("TELEGRAM_BOT_TOKEN"):
+        return
+    client, chat_id = get_telegram_client(env), env.get("TELEGRAM_CHAT_ID", "")
+    text = f"❌ {key[1]}: {msg}"[:CAPTION_LIMIT]
+    path = BuildLog.get_file(key)
+    try:
+        if path and os.path.exists(path):
+            client.send_document(chat_id, path, text, log)
+        else:
+            client.call("sendMessage", {"chat_id": chat_id, "text": text}, log=log)
+    except Exception as e:
+        log.warning(f"Could not send the failure notification: {e}")
 
-        upload_itch(config, env, log, build_path_to_push)
-        upload_tg(config, env, log, build_path_to_push, history_file)
-        upload_dropbox(config, env, log, build_path_to_push, history_file)
-        log.info(f"'{env['REPO_PATH']}' Build done.")
 
-    except subprocess.CalledProcessError as e:
+def report_build_error(env, log, e, keys=()):
+    if isinstance(e, UnityRunner.UnityBuildError):
+        msg = f"'{env['REPO_PATH']}' Unity build failed: {e}"
+        log.error(msg)
+    elif isinstance(e, subprocess.CalledProcessError):
         msg = f"'{env['REPO_PATH']}' Unity build or upload failed: {e}"
         log.error(msg)
-        ALL_ERRORS.append(msg)
-    except Exception as e:
+    else:
         msg = f"Unexpected error during build for '{env['REPO_PATH']}': {e}"
         log.exception(msg)
-        ALL_ERRORS.append(msg)
+    ALL_ERRORS.append(msg)
+    # After the error is logged, so the captured build log ends with it
+    for key in keys:
+        scheduler.set_stage(key, "failed")
+    for key in keys:
+        notify_failure(env, key, msg, log)
+
+
+def get_build_fingerprint(config, env, ENV_UNITY, log):
+    # None when the inputs cannot be fingerprinted (NO_GIT builds) or skipping is off
+    commit = env.get("BUILD_COMMIT")
+    if not commit or not env.get("SKIP_UNCHANGED_BUILDS", True):
+        return None
+    try:
+        return Fingerprint.get_fingerprint(env["REPO_PATH"], commit, config, ENV_UNITY)
+    except Exception as e:
+        log.warning(f"'{env['REPO_PATH']}' Could not fingerprint build inputs: {e}")
+        return None
+
+
+def skip_unchanged_build(config, env, log, fingerprint):
+    # True if the last build of this target had the same inputs, so Unity is not needed
+    key = get_job_key(config, env)
+    if not fingerprint or not Fingerprint.is_unchanged(key, fingerprint, get_output_path(config, env)):
+        return False
+
+    log.info(f"'{env['REPO_PATH']}' Build inputs unchanged since the last build, skipping Unity.")
+    Metrics.add([key], "unity", time.time(), cache_hit=True)
+    if not config.get("REPUBLISH_UNCHANGED", False) or publish_build(config, env, log):
+        scheduler.set_stage(key, "skipped")
+    return True
+
+
+def acquire_output_folder(config, env):
+    # Waits while an earlier build of this folder is still being published
+    token = get_current_token()
+    return scheduler.acquire_folder(get_output_path(config, env), get_job_key(config, env),
+                                    token.check if token else None)
+
+
+def publish_and_release(config, env, log, lease):
+    # Post-processing worker: publishes a finished build, then frees its output folder
+    try:
+        publish_build(config, env, log)
+    except Exception as e:
+        report_build_error(env, log, e, [get_job_key(config, env)])
+    finally:
+        lease.release()
+
+
+def build_unity_project(config, env, ENV_UNITY, log):
+    try:
+        fingerprint = get_build_fingerprint(config, env, ENV_UNITY, log)
+        if skip_unchanged_build(config, env, log, fingerprint):
+            return
+        lease = acquire_output_folder(config, env)
+        try:
+            run_unity_build(config, env, ENV_UNITY, log)
+            if fingerprint:
+                Fingerprint.save(get_job_key(config, env), fingerprint)
+            # Публикация уходит в свой пул, а этот воркер свободен для следующей сборки
+            scheduler.submit_post(get_job_key(config, env), publish_and_release, config, env, log, lease)
+        except BaseException:
+            lease.release()
+            raise
+    except BuildCancelled as e:
+        log.info(f"'{env['REPO_PATH']}' Build cancelled: {e}")
+        scheduler.set_stage(get_job_key(config, env), "cancelled")
+    except Exception as e:
+        report_build_error(env, log, e, [get_job_key(config, env)])
+
+
+def read_batch_results(result_file):
+    results = {}
+    if not os.path.exists(result_file):
+        return results
+    with open(result_file) as f:
+        for line in f:
+            target, _, status = line.strip().partition("=")
+            if target:
+                results[target] = status == "Succeeded"
+    return results
+
+
+def build_unity_projects_batch(jobs, env, ENV_UNITY):
+    # jobs: [(config, log)] of one project at one commit; built by a single Unity launch
+    # Targets whose inputs did not change since their last build stay out of the Unity launch
+    fingerprints = {}
+    changed_jobs = []
+    for config, target_log in jobs:
+        fingerprint = get_build_fingerprint(config, env, ENV_UNITY, target_log)
+        try:
+            if skip_unchanged_build(config, env, target_log, fingerprint):
+                continue
+        except Exception as e:
+            report_build_error(env, target_log, e, [get_job_key(config, env)])
+            continue
+        fingerprints[config["BUILD_TARGET"]] = fingerprint
+        changed_jobs.append((config, target_log))
+    jobs = changed_jobs
+
+    if not jobs:
+        return
+    if len(jobs) == 1:
+        config, log = jobs[0]
+        build_unity_project(config, env, ENV_UNITY, log)
+        return
+
+    configs = [config for config, _ in jobs]
+    targets = [config["BUILD_TARGET"] for config in configs]
+    log = jobs[0][1]
+    fd, result_file = tempfile.mkstemp(prefix="autobuild_", suffix=".txt")
+    os.close(fd)
+    os.remove(result_file)
+    leases = {}  # BUILD_TARGET -> output folder lease, until handed to post-processing
+
+    try:
+        # In a fixed order, so two batches sharing folders cannot wait on each other
+        for config in sorted(configs, key=lambda config: get_output_path(config, env)):
+            leases[config["BUILD_TARGET"]] = acquire_output_folder(config, env)
+        cmd = get_unity_batch_build_command(configs, env, ENV_UNITY, result_file)
+        keys = [get_job_key(config, env) for config in configs]
+        with scheduler.unity_slot(env["REPO_PATH"]):
+            sync_checkout(env, log, keys)
+            for key in keys:
+                scheduler.set_stage(key, "unity")
+            log.info(f"'{env['REPO_PATH']}' Starting Unity batch build: {', '.join(targets)}")
+            failure = None
+            try:
+                run_unity(cmd, env, get_unity_log_name(env, "Batch"), log, keys)
+            except UnityRunner.UnityBuildError as e:
+                failure = str(e)  # Per-target results are in the result file
+            log.info(f"'{env['REPO_PATH']}' Unity batch build finished{f': {failure}' if failure else '.'}")
+        results = read_batch_results(result_file)
+    except BuildCancelled as e:
+        log.info(f"'{env['REPO_PATH']}' Batch build cancelled: {e}")
+        for config in configs:
+            scheduler.set_stage(get_job_key(config, env), "cancelled")
+        release_leases(leases.values())
+        return
+    except Exception as e:
+        report_build_error(env, log, e, [get_job_key(config, env) for config in configs])
+        release_leases(leases.values())
+        return
+    finally:
+        if os.path.exists(result_file):
+            os.remove(result_file)
+
+    # Каждый таргет публикуется и получает свой статус отдельно, на пуле постобработки
+    for config, target_log in jobs:
+        lease = leases[config["BUILD_TARGET"]]
+        if not results.get(config["BUILD_TARGET"], False):
+            msg = f"'{env['REPO_PATH']}' Unity build failed for {config['BUILD_TARGET']} ({failure or 'see the Unity log'})"
+            target_log.error(msg)
+            ALL_ERRORS.append(msg)
+            scheduler.set_stage(get_job_key(config, env), "failed")
+            notify_failure(env, get_job_key(config, env), msg, target_log)
+            lease.release()
+            continue
+        if fingerprints.get(config["BUILD_TARGET"]):
+            Fingerprint.save(get_job_key(config, env), fingerprints[config["BUILD_TARGET"]])
+        scheduler.submit_post(get_job_key(config, env), publish_and_release, config, env, target_log, lease)
+
+
+def release_leases(leases):
+    for lease in leases:
+        lease.release()
 
 
 def ensure_build_path_exists(path):
@@ -266,88 +761,262 @@ def check_butler_login():
 
 
 def build_project_always(config, env, ENV_UNITY, log):
+    BuildLog.start([get_job_key(config, env)])
     log.info(f"'{env['REPO_PATH']}' NO_GIT flag is set. Building project directly.")
     build_unity_project(config, env, ENV_UNITY, log)
 
 
-def build_project_on_commit_change(config,env, ENV_UNITY, log, last_commit_hashes, forced_built):
-    repo_path = env["REPO_PATH"]
+def build_batch_always(jobs, env, ENV_UNITY):
+    BuildLog.start([get_job_key(config, env) for config, _ in jobs])
+    build_unity_projects_batch(jobs, env, ENV_UNITY)
 
-    log.info(f"'{repo_path}' Checking for new commits...")
 
+def build_commit(config, env, ENV_UNITY, log, commit_hash):
+    # Runs from the build queue, once the commit has settled
+    BuildLog.start([get_job_key(config, env)])
+    StateStore.start_build(get_job_key(config, env), commit_hash)
+    Metrics.set_fields([get_job_key(config, env)], commit=commit_hash)
     try:
-        pull_latest_changes(repo_path, env["BRANCH"], log)
-        current_commit_hash = get_latest_commit_hash(repo_path, log)
+        build_env = get_build_env(config.get("BUILD_TARGET", "Unknown"), env, commit_hash, log,
+                                  [get_job_key(config, env)])
+    except Exception as e:
+        report_build_error(env, log, e, [get_job_key(config, env)])
+        return
+    build_unity_project(config, dict(build_env, BUILD_COMMIT=commit_hash), ENV_UNITY, log)
+
+
+def build_commit_batch(jobs, env, ENV_UNITY, commit_hash):
+    log = jobs[0][1]
+    keys = [get_job_key(config, env) for config, _ in jobs]
+    BuildLog.start(keys)
+    for key in keys:
+        StateStore.start_build(key, commit_hash)
+    Metrics.set_fields(keys, commit=commit_hash)
+    try:
+        build_env = get_build_env("Batch", env, commit_hash, log, keys)
+    except Exception as e:
+        report_build_error(env, log, e, keys)
+        return
+    build_unity_projects_batch(jobs, dict(build_env, BUILD_COMMIT=commit_hash), ENV_UNITY)
+
+
+def enqueue_builds(project, commit_hash, configs=None):
+    # A newer commit replaces an older pending one of the same target
+    env = project.ENV
+    configs = configs or project.get_git_configs()
+    if env.get("BATCH_TARGETS", False):
+        jobs = [(config, project.get_logger(config)) for config in configs]
+        build_queue.push((project.name, "Batch"), commit_hash, build_commit_batch, jobs, env, project.ENV_UNITY, commit_hash)
+        return
+
+    for config in configs:
+        build_queue.push(get_job_key(config, env), commit_hash, build_commit,
+                         config, env, project.ENV_UNITY, project.get_logger(config), commit_hash)
+
+
+def check_project_for_changes(project):
+    env = project.ENV
+    repo_path = project.repo_path
+    log = project.get_logger()
+
+    try:
+        should_force = env.get("FORCE_BUILD_GIT", False) and not project.forced_built
+        remote_commit_hash = fetch_latest_changes(repo_path, env["BRANCH"], log)
+        if remote_commit_hash is None and not should_force:
+            return
+
+        log.info(f"'{repo_path}' Checking for new commits...")
+        current_commit_hash = remote_commit_hash or get_latest_commit_hash(repo_path, log)
         if current_commit_hash is None:
             log.warning(f"'{repo_path}' Skipping project due to invalid git repository.")
             return
 
-        should_force = env.get("FORCE_BUILD_GIT", False) and repo_path not in forced_built
-
         if should_force:
             log.info(f"'{repo_path}' Forced build triggered.")
-            build_unity_project(config,env, ENV_UNITY, log)
-            last_commit_hashes[repo_path] = current_commit_hash
-            forced_built.add(repo_path)
-        elif current_commit_hash != last_commit_hashes[repo_path]:
+            project.forced_built = True
+            StateStore.set_forced_commit(project.name, current_commit_hash)
+        elif current_commit_hash != project.last_commit_hash:
             log.info(f"'{repo_path}' New commit detected: {current_commit_hash}")
-            last_commit_hashes[repo_path] = current_commit_hash
-            build_unity_project(config,env, ENV_UNITY, log)
         else:
             log.info(f"'{repo_path}' No new commits found.")
+            return
+
+        project.last_commit_hash = current_commit_hash
+        # Saved before the builds start, so a crash cannot lose the commit
+        StateStore.set_last_commit(project.name, current_commit_hash)
+        enqueue_builds(project, current_commit_hash)
 
     except Exception as e:
         log.error(f"Error while processing project: {e}")
 
 
-def init_loggers_and_hashes():
-    loggers = {}
-    last_commit_hashes = {}
-
-    for config in Config.CONFIGS:
-        repo_path = Config.ENV["REPO_PATH"]
+def init_project(project):
+    # One logger per (project, target), plus "Check" for the git polling
+    repo_path = project.repo_path
+    project.loggers["Check"] = setup_logger(project.name, "Check")
+    for config in project.CONFIGS:
         build_target = config.get("BUILD_TARGET", "Unknown")
-        log = setup_logger(repo_path, build_target)
-        loggers[repo_path] = log
+        log = setup_logger(project.name, build_target)
+        project.loggers[build_target] = log
 
         if config.get("NO_GIT", False):
             log.info(f"'{repo_path}' NO_GIT flag is enabled. Will only build, skipping git.")
             continue
 
-        initial_hash = record_init_commit_hash(config, Config.ENV, log)
+        initial_hash = record_init_commit_hash(config, project.ENV, log)
         if initial_hash is None:
             log.warning(f"'{repo_path}' Skipping project due to invalid git repository.")
             continue
 
-        last_commit_hashes[repo_path] = initial_hash
+        project.last_commit_hash = initial_hash
+
 
-    return loggers, last_commit_hashes
+def get_unfinished_configs(project):
+    # Git targets without a finished build of the project's last enqueued commit:
+    # interrupted, cancelled, or never started because the daemon stopped first
+    unfinished = []
+    for config in project.get_git_configs():
+        target = StateStore.get_target(get_job_key(config, project.ENV))
+        if (not target or target["commit_hash"] != project.last_commit_hash
+                or target["status"] not in RESUMED_STATUSES):
+            unfinished.append(config)
+    return unfinished
 
 
-def execute_no_git(loggers):
-    # Отдельно собрать NO_GIT-конфиги и удалить их из общего списка
-    no_git_configs = [config for config in Config.CONFIGS if config.get("NO_GIT", False)]
+def resume_project(project):
+    # After a restart the commits the last run saw are not built again, and the builds it
+    # left unfinished are queued. The first run starts from the checkout's HEAD instead
+    state = StateStore.get_project(project.name)
+    if not state or not state["last_commit"] or project.last_commit_hash is None:
+        return
+    project.last_commit_hash = state["last_commit"]
+    project.forced_built = state["forced_commit"] == state["last_commit"]
+    unfinished = get_unfinished_configs(project)
+    log = project.get_logger()
+    if not unfinished:
+        log.info(f"'{project.repo_path}' Resuming after {state['last_commit']}, every target is up to date.")
+        return
+    log.info(f"'{project.repo_path}' Resuming {state['last_commit']}: "
+             f"{', '.join(config['BUILD_TARGET'] for config in unfinished)} did not finish, queueing them again.")
+    enqueue_builds(project, state["last_commit"], unfinished)
+
+
+def execute_no_git(projects):
+    # Сначала выполнить билд для NO_GIT-конфигов всех проектов (параллельно, через пул)
+    for project in projects:
+        no_git_configs = project.get_no_git_configs()
+        if project.ENV.get("BATCH_TARGETS", False) and no_git_configs:
+            jobs = [(config, project.get_logger(config)) for config in no_git_configs]
+            scheduler.submit((project.name, "Batch"), build_batch_always, jobs, project.ENV, project.ENV_UNITY)
+        else:
+            for config in no_git_configs:
+                scheduler.submit(get_job_key(config, project.ENV), build_project_always,
+                                 config, project.ENV, project.ENV_UNITY, project.get_logger(config))
+    scheduler.wait_all()
+
+    # После завершения всех NO_GIT сборок
+    for project in projects:
+        for config in project.get_no_git_configs():
+            project.get_logger(config).info(f"All NO_GIT builds completed successfully.")
+
+
+recheck_requests = set()  # project names that were pushed to while their check was running
+recheck_lock = threading.Lock()
+
+
+def run_git_check(project):
+    # Checks again if a push arrived while the check was running (it may have missed the push)
+    while True:
+        check_project_for_changes(project)
+        with recheck_lock:
+            if project.name not in recheck_requests:
+                return
+            recheck_requests.discard(project.name)
+
+
+def enqueue_git_checks(project, recheck=False):
+    # Returns 1 if a check was enqueued (or requested from the running one), 0 otherwise
+    if not project.get_git_configs() or project.last_commit_hash is None:
+        return 0
+    with recheck_lock:
+        future = scheduler.submit((project.name, "Check"), run_git_check, project)
+        if future:
+            recheck_requests.discard(project.name)
+            return 1
+        if recheck:
+            recheck_requests.add(project.name)
+            return 1
+    return 0
+
+
+def is_webhook_match(env, repo_names, branch):
+    poller = RepoPoller.get_poller(env["REPO_PATH"], env["BRANCH"], CHECK_INTERVAL, POLL_MAX_INTERVAL)
+    if branch != poller.branch:
+        return False
+    if env.get("WEBHOOK_REPO", "").lower() in repo_names:
+        return True
+    try:
+        url = RepoPoller.get_repo(env["REPO_PATH"]).remotes[poller.remote].url
+    except Exception:
+        return False
+    return Webhook.normalize_repo_url(url) in repo_names
 
-    # Сначала выполнить билд для NO_GIT-конфигов
-    for config in no_git_configs:
-        repo_path = Config.ENV["REPO_PATH"]
-        log = loggers[repo_path]
-        build_project_always(config, Config.ENV, Config.ENV_UNITY, log)
 
-    if no_git_configs:
-        # После завершения всех NO_GIT сборок
-        for config in no_git_configs:
-            repo_path = Config.ENV["REPO_PATH"]
-            log = loggers[repo_path]
-            log.info(f"All NO_GIT builds completed successfully.")
+def start_webhook(projects):
+    log = setup_logger("autobuilder", "Webhook")
+
+    def on_push(repo_names, branch):
+        enqueued = 0
+        for project in projects:
+            if not is_webhook_match(project.ENV, repo_names, branch):
+                continue
+            # Skip the poll back-off: the remote has definitely moved
+            RepoPoller.get_poller(project.repo_path, project.ENV["BRANCH"], CHECK_INTERVAL, POLL_MAX_INTERVAL).reset()
+            enqueued += enqueue_git_checks(project, recheck=True)
+        return enqueued
+
+    secrets = [project.ENV.get("WEBHOOK_SECRET", "") for project in projects]
+    server = Webhook.WebhookServer(WEBHOOK_PORT, secrets, on_push, log)
+    server.start()
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Builds Unity projects from Configs/Config*.py and uploads them.")
+    parser.add_argument("projects", nargs="*",
+                        help="projects to serve, e.g. Castle HellDigger (default: every config except Example)")
+    parser.add_argument("--list", action="store_true", help="print the available projects and exit")
+    parser.add_argument("--max-jobs", type=int, default=Scheduler.MAX_WORKERS,
+                        help="build jobs at once: git checks, checkouts, Unity")
+    parser.add_argument("--max-unity", type=int, default=Scheduler.MAX_UNITY_PROCESSES,
+                        help="Unity editors at once")
+    parser.add_argument("--max-post", type=int, default=Scheduler.MAX_POST_WORKERS,
+                        help="finished builds packaged and uploaded at once, next to the Unity builds")
+    parser.add_argument("--metrics-textfile", default=Metrics.TEXTFILE,
+                        help="Prometheus text file with the latest build metrics, e.g. in node_exporter's "
+                             "textfile directory (per-build records go to log/metrics.jsonl)")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+    if args.list:
+        print("\n".join(Projects.get_available_names()))
+        return
+
+    try:
+        projects = Projects.load_projects(args.projects)
+    except ValueError as e:
+        print(e)
+        exit(1)
     ensure_build_path_exists("log")
-    loggers, last_commit_hashes = init_loggers_and_hashes()
-    forced_built = set()
+    init_scheduler(args.max_jobs, args.max_unity, args.max_post)
+    Metrics.TEXTFILE = args.metrics_textfile
+    for project in projects:
+        init_project(project)
+    print(f"Serving {len(projects)} project(s): {', '.join(project.name for project in projects)}")
 
-    execute_no_git(loggers)
+    execute_no_git(projects)
 
     # После выполнения всех no_git билдов вывести общий лог
     if ALL_ERRORS:
@@ -358,17 +1027,27 @@ def main():
     else:
         print("\n✅ All NO_GIT builds completed without errors.\n")
 
-    git_configs = [config for config in Config.CONFIGS if not config.get("NO_GIT", False)]
-    # Теперь работать только с git-конфигами в цикле
-    while True:
-        for config in git_configs:
-            repo_path = Config.ENV["REPO_PATH"]
-            log = loggers[repo_path]
-            if repo_path not in last_commit_hashes:
-                continue
-            build_project_on_commit_change(config, Config.ENV, Config.ENV_UNITY, log, last_commit_hashes, forced_built)
+    git_projects = [project for project in projects if project.get_git_configs()]
+    check_interval = CHECK_INTERVAL
+    if WEBHOOK_PORT and git_projects:
+        start_webhook(git_projects)
+        # Пуши приходят через webhook, опрос остаётся редкой подстраховкой
+        check_interval = WEBHOOK_POLL_INTERVAL
 
-        time.sleep(CHECK_INTERVAL)
+    for project in git_projects:
+        resume_project(project)
+    build_queue.start()
+
+    # Теперь работать только с git-конфигами в цикле; у каждого проекта свой интервал опроса
+    try:
+        while True:
+            for project in git_projects:
+                enqueue_git_checks(project)
+            time.sleep(check_interval)
+    except KeyboardInterrupt:
+        # Сборки запущены в отдельных группах процессов, Ctrl+C до них не доходит
+        build_queue.cancel_all()
+        raise
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()